@@ -1,24 +1,45 @@
+import click
 from flask import Flask, render_template, request, redirect, url_for, abort, flash, send_file, jsonify, session
-from sqlalchemy import create_engine, or_, and_, not_
-from sqlalchemy.orm import sessionmaker, joinedload
-from models import Base, EagleTrustFundDonor, EagleTrustFundTransaction
+from sqlalchemy import event, create_engine, or_, and_, not_, func, tuple_, exists, bindparam, cast, case, insert, update, values, column, literal, Integer, Numeric, Date, Text
+from sqlalchemy.dialects.postgresql import ARRAY
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import sessionmaker, joinedload, load_only, selectinload
+from models import Base, EagleTrustFundDonor, EagleTrustFundTransaction, EagleTrustFundBatchSubmission
+from donor_profiles import format_currency, write_donor_profile_pdf, render_donor_profile_chunk, init_worker as init_profile_worker
 from dotenv import load_dotenv
 import os
 from datetime import datetime
 from decimal import Decimal, InvalidOperation
 from math import ceil
+from operator import attrgetter
 import csv
+import gzip
 import io
+import json
+import multiprocessing
+import queue
+import hashlib
+import secrets
+import sqlite3
+import tempfile
+import threading
 import time
+import zlib
+import zipfile
+from array import array
+from collections import OrderedDict, deque
+from itertools import islice
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from contextlib import closing
 from reportlab.lib import colors
 from reportlab.lib.pagesizes import landscape, letter
-from reportlab.platypus import SimpleDocTemplate, Table, TableStyle, Paragraph
+from reportlab.platypus import SimpleDocTemplate, Flowable, Table, TableStyle, Paragraph
 from reportlab.lib.styles import getSampleStyleSheet
 from reportlab.lib.units import inch
 from datetime import timedelta
 
 #DONE: Fix filter issues for donor status and newsletter status.
-#TODO: Fix bug where batches page will not allow submission if add rows value is over 50.
+#DONE: Fix bug where batches page will not allow submission if add rows value is over 50.
 #DONE: Make the transaction report downloads show the total amount for an individual donor if they made payments to multiple accounts.
 
 # To-do's from John
@@ -59,19 +80,530 @@ DATABASE_URL = f"postgresql://{DB_USER}:{DB_PASS}@{DB_HOST}:{DB_PORT}/{DB_NAME}"
 ITEMS_PER_PAGE = 50
 
 # Constants for download limits and processing
-MAX_DOWNLOAD_RESULTS = 10000  # Maximum number of donors for downloads
-MAX_PDF_RESULTS = 5000       # Maximum number of donors for PDF generation
+MAX_PDF_RESULTS = 5000       # Maximum number of donors for direct PDF downloads (larger ones run as background exports)
 DOWNLOAD_CHUNK_SIZE = 1000   # Process downloads in chunks to avoid memory issues
+PDF_TABLE_CHUNK_ROWS = 250   # PDF rows read ahead at a time, and the first guess at how many fit on a page
+CSV_GZIP_LEVEL = 6       # zlib level for compressed CSV downloads (speed over the last few percent)
+COPY_QUEUE_CHUNKS = 16       # Blocks of COPY output buffered between the database and the response
+
+# Background export jobs: files are written by a local worker pool and downloaded when ready
+EXPORT_DIR = os.getenv("EXPORT_DIR", os.path.join(tempfile.gettempdir(), "donor_db_exports"))
+EXPORT_WORKERS = int(os.getenv("EXPORT_WORKERS", 2))
+EXPORT_FILE_TTL = 24 * 3600  # Finished export files (and their jobs) are removed after a day
+EXPORT_JOB_STALL_TIMEOUT = 1800  # A running job with no progress for this long is reported as failed
+
+# Finished CSV/PDF downloads are kept on disk so identical repeat downloads skip the database;
+# entries are keyed by content (rows, columns, format, data version) and evicted least recently used
+EXPORT_CACHE_DIR = os.getenv("EXPORT_CACHE_DIR", os.path.join(tempfile.gettempdir(), "donor_db_export_cache"))
+EXPORT_CACHE_MAX_BYTES = int(os.getenv("EXPORT_CACHE_MAX_BYTES", 2 * 1024 ** 3))
+EXPORT_CACHE_TTL = 3600  # Upper bound on staleness for changes made outside the app (psql, imports)
+
+BATCH_SUMMARY_CACHE_ENTRIES = 256  # Batch summaries kept in process memory for check_existing_batch
+BATCH_SUMMARY_CACHE_TTL = 300      # ... for at most 5 minutes (changes made outside the app bump no version)
+
+# Draft batches for the JSON batch API: rows are sent in chunks, validated as they arrive and
+# committed together (see /api/batches)
+BATCH_DRAFT_PATH = os.getenv("BATCH_DRAFT_PATH", os.path.join(tempfile.gettempdir(), "donor_db_batch_drafts.sqlite3"))
+BATCH_DRAFT_TTL = 12 * 3600       # Abandoned drafts are removed after 12 hours
+BATCH_API_MAX_CHUNK_ROWS = 1000   # Maximum rows per chunk request
+
+# Bulk donor profile PDFs (ZIP of one PDF per donor), rendered in worker processes
+MAX_PROFILE_PDF_RESULTS = 2000  # Maximum number of donor profiles in one ZIP
+PROFILE_PDF_PROCESSES = int(os.getenv("PROFILE_PDF_PROCESSES", os.cpu_count() or 2))
+PROFILE_PDF_CHUNK_SIZE = 25     # Donors rendered per worker task
+PROFILE_PDF_WINDOW = 2 * PROFILE_PDF_PROCESSES  # Worker tasks submitted ahead of the ZIP stream
+
+# Donor columns offered in search results and downloads (attribute name -> header)
+DONOR_RESULT_COLUMNS = {
+    'base_donor_id': 'Donor ID',
+    'old_donor_id': 'Legacy Donor ID',
+    'alternate_id': 'Alternate ID',
+    'name_prefix': 'Name Prefix',
+    'first_name': 'First Name',
+    'last_name': 'Last Name',
+    'suffix': 'Suffix',
+    'formatted_full_name': 'Full Name',
+    'secondary_title': 'Secondary Title',
+    'secondary_first_name': 'Secondary First Name',
+    'secondary_last_name': 'Secondary Last Name',
+    'secondary_suffix': 'Secondary Suffix',
+    'secondary_full_name': 'Secondary Full Name',
+    'address_1_company': 'Company',
+    'address_2_secondary': 'Address Secondary',
+    'address_3_primary': 'Address Primary',
+    'city': 'City',
+    'state': 'State',
+    'zip_plus4': 'ZIP+4',
+    'phone': 'Phone',
+    'work_phone': 'Work Phone',
+    'cell_phone': 'Cell Phone',
+    'salutation_dear': 'Salutation',
+    'removal_request_note': 'Removal Request',
+    'twitter': 'Twitter',
+    'newsletter_status': 'Newsletter Status',
+    'newsletter_status_desc': 'Newsletter Status Desc',
+    'donor_status': 'Donor Status',
+    'donor_status_desc': 'Donor Status Desc',
+    'date_added_to_database': 'Date Added',
+    'email_address': 'Email',
+    'interest_borders': 'Interests - Borders',
+    'interest_pro_life': 'Interests - Pro Life',
+    'interest_eagle_council': 'Interests - Eagle Council',
+    'interest_topic_1': 'Interest Topic 1',
+    'interest_topic_2': 'Interest Topic 2',
+    'interest_topic_3': 'Interest Topic 3',
+    'interest_topic_4': 'Interest Topic 4',
+    'education_reporter_status': 'Education Reporter Status',
+    'expiration_date': 'Expiration Date',
+    'news_and_notes_status': 'News Notes Status',
+    'rnc_life_status': 'RNC Life Status',
+    'eagle_status': 'Eagle Status',
+    'eagle_state_president': 'Eagle State President',
+    'flag': 'Flag',
+    'changed': 'Changed',
+    'interest': 'Interest',
+    'house_publications': 'House Publications',
+    'latest_date': 'Latest Date',
+    'latest_amount': 'Latest Amount',
+    'largest_date': 'Largest Date',
+    'largest_amount': 'Largest Amount',
+    'inception_date': 'Inception Date',
+    'inception_amount': 'Inception Amount',
+    'total_dollar_amount': 'Total Amount',
+    'total_responses_non_zero': 'Total Responses (Non-Zero)',
+    'total_responses_includes_zero': 'Total Responses'
+}
+
+# Donor columns formatted as currency in results and downloads
+DONOR_CURRENCY_COLUMNS = frozenset(['total_dollar_amount', 'latest_amount', 'largest_amount', 'inception_amount'])
+
+# Server-side store for search result donor IDs (kept out of the cookie session)
+RESULT_STORE_PATH = os.getenv("RESULT_STORE_PATH", os.path.join(tempfile.gettempdir(), "donor_db_result_sets.sqlite3"))
+RESULT_STORE_TTL = 1800            # Cached search results expire after 30 minutes
+RESULT_STORE_MAX_ENTRIES = 500     # Least recently used result sets beyond this are evicted
+RESULT_STORE_MEMORY_ENTRIES = 32   # Most recently used result sets also kept in process memory
+
+# Result counts: "exact" always counts matches (in the same statement as the first page);
+# "estimated" uses the planner's row estimate when it is above ESTIMATED_COUNT_THRESHOLD
+SEARCH_COUNT_MODE = os.getenv("SEARCH_COUNT_MODE", "exact").lower()
+ESTIMATED_COUNT_THRESHOLD = int(os.getenv("ESTIMATED_COUNT_THRESHOLD", 20000))
 
 # SQLAlchemy engine and session factory
 engine = create_engine(DATABASE_URL)
 Base.metadata.bind = engine
 Session = sessionmaker(bind=engine)
 
+class ResultSetStore:
+    """TTL + LRU store for donor search result sets, keyed by a short token kept in the session.
+
+    An entry holds the search parameters, the result count, the keyset cursors of the pages seen
+    so far and - once something needs them - the ordered donor IDs. Every entry is written to a
+    SQLite file so all worker processes on the host can read it; the most recently used ones are
+    also held in memory to skip the file read.
+    """
+
+    def __init__(self, path, ttl, max_entries, memory_entries):
+        self.path = path
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.memory_entries = memory_entries
+        self._memory = OrderedDict()
+        self._lock = threading.Lock()
+        with closing(self._connect()) as conn, conn:
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS search_result_sets ("
+                " token TEXT PRIMARY KEY, donor_ids BLOB, data TEXT NOT NULL,"
+                " created_at REAL NOT NULL, last_access REAL NOT NULL)"
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS ix_search_result_sets_last_access ON search_result_sets (last_access)")
+
+    def _connect(self):
+        return sqlite3.connect(self.path, timeout=10)
+
+    def _remember(self, token, entry):
+        """Put an entry at the most recently used end of the in-memory LRU"""
+        with self._lock:
+            self._memory[token] = entry
+            self._memory.move_to_end(token)
+            while len(self._memory) > self.memory_entries:
+                self._memory.popitem(last=False)
+
+    def put(self, result_set, token=None):
+        """Store a result set (replacing `token` if given) and return the token that identifies it"""
+        token = token or secrets.token_urlsafe(12)
+        now = time.time()
+        entry = {
+            'donor_ids': array('q', result_set['donor_ids']) if result_set.get('donor_ids') is not None else None,
+            'search_params': result_set['search_params'],
+            'count': result_set['count'],
+            'estimated': result_set.get('estimated', False),
+            'page_cursors': result_set.get('page_cursors') or [],
+            'timestamp': result_set.get('timestamp', now),
+        }
+        data = {key: entry[key] for key in ('search_params', 'count', 'estimated', 'page_cursors')}
+        with closing(self._connect()) as conn, conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO search_result_sets (token, donor_ids, data, created_at, last_access)"
+                " VALUES (?, ?, ?, ?, ?)",
+                (token, entry['donor_ids'].tobytes() if entry['donor_ids'] is not None else None,
+                 json.dumps(data), entry['timestamp'], now)
+            )
+            # Expire old result sets, then evict least recently used ones over the cap
+            conn.execute("DELETE FROM search_result_sets WHERE created_at < ?", (now - self.ttl,))
+            conn.execute(
+                "DELETE FROM search_result_sets WHERE token IN ("
+                " SELECT token FROM search_result_sets ORDER BY last_access DESC LIMIT -1 OFFSET ?)",
+                (self.max_entries,)
+            )
+        self._remember(token, entry)
+        return token
+
+    def get(self, token):
+        """Return the result set stored under `token` (donor_ids is None until materialized), or None if missing/expired"""
+        now = time.time()
+        with self._lock:
+            entry = self._memory.get(token)
+        if entry is None:
+            with closing(self._connect()) as conn:
+                row = conn.execute(
+                    "SELECT donor_ids, data, created_at FROM search_result_sets WHERE token = ?", (token,)
+                ).fetchone()
+            if row is None:
+                return None
+            donor_ids = None
+            if row[0] is not None:
+                donor_ids = array('q')
+                donor_ids.frombytes(row[0])
+            entry = dict(json.loads(row[1]), donor_ids=donor_ids, timestamp=row[2])
+
+        if now - entry['timestamp'] > self.ttl:
+            self.discard(token)
+            return None
+
+        with closing(self._connect()) as conn, conn:
+            conn.execute("UPDATE search_result_sets SET last_access = ? WHERE token = ?", (now, token))
+        self._remember(token, entry)
+        return dict(
+            entry,
+            token=token,
+            donor_ids=entry['donor_ids'].tolist() if entry['donor_ids'] is not None else None,
+            page_cursors=list(entry['page_cursors']),
+        )
+
+    def discard(self, token):
+        with self._lock:
+            self._memory.pop(token, None)
+        with closing(self._connect()) as conn, conn:
+            conn.execute("DELETE FROM search_result_sets WHERE token = ?", (token,))
+
+result_store = ResultSetStore(RESULT_STORE_PATH, RESULT_STORE_TTL, RESULT_STORE_MAX_ENTRIES, RESULT_STORE_MEMORY_ENTRIES)
+
+class ExportJobRegistry:
+    """Status of background export jobs, kept in a SQLite file so any worker process can report on them.
+
+    A job is created as "queued", then moves to "running" and ends as "done" (file ready in
+    EXPORT_DIR) or "failed" (with the error message). Each job records the browser session that
+    started it (`owner`) and the web worker process running it (`pid`); get() reports a job as
+    failed once that process is gone, or when a running job has made no progress for
+    EXPORT_JOB_STALL_TIMEOUT, so a job whose worker died doesn't stay "running" forever.
+    """
+
+    def __init__(self, directory):
+        self.directory = directory
+        os.makedirs(directory, exist_ok=True)
+        self.path = os.path.join(directory, "export_jobs.sqlite3")
+        with closing(self._connect()) as conn, conn:
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS export_jobs ("
+                " job_id TEXT PRIMARY KEY, format TEXT NOT NULL, filename TEXT NOT NULL,"
+                " status TEXT NOT NULL, rows_done INTEGER NOT NULL DEFAULT 0, rows_total INTEGER NOT NULL,"
+                " error TEXT, created_at REAL NOT NULL, finished_at REAL,"
+                " owner TEXT, pid INTEGER, updated_at REAL)"
+            )
+            # Registries created before jobs had owners: add the columns (their old jobs have no owner)
+            columns = {row['name'] for row in conn.execute("PRAGMA table_info(export_jobs)")}
+            for name, definition in (('owner', 'TEXT'), ('pid', 'INTEGER'), ('updated_at', 'REAL')):
+                if name not in columns:
+                    conn.execute(f"ALTER TABLE export_jobs ADD COLUMN {name} {definition}")
+
+    def _connect(self):
+        conn = sqlite3.connect(self.path, timeout=10)
+        conn.row_factory = sqlite3.Row
+        return conn
+
+    def file_path(self, job):
+        """Where the export file of a job is written"""
+        return os.path.join(self.directory, f"{job['job_id']}.{job['format']}")
+
+    def create(self, format, filename, rows_total, owner):
+        """Register a queued job, to be run by this process's export pool"""
+        job_id = secrets.token_urlsafe(12)
+        now = time.time()
+        with closing(self._connect()) as conn, conn:
+            conn.execute(
+                "INSERT INTO export_jobs (job_id, format, filename, status, rows_total, created_at, owner, pid, updated_at)"
+                " VALUES (?, ?, ?, 'queued', ?, ?, ?, ?, ?)",
+                (job_id, format, filename, rows_total, now, owner, os.getpid(), now)
+            )
+        return job_id
+
+    def update(self, job_id, **fields):
+        fields['updated_at'] = time.time()
+        assignments = ", ".join(f"{name} = ?" for name in fields)
+        with closing(self._connect()) as conn, conn:
+            conn.execute(f"UPDATE export_jobs SET {assignments} WHERE job_id = ?", (*fields.values(), job_id))
+
+    def get(self, job_id):
+        with closing(self._connect()) as conn:
+            row = conn.execute("SELECT * FROM export_jobs WHERE job_id = ?", (job_id,)).fetchone()
+        if row is None:
+            return None
+        job = dict(row)
+        error = self._abandoned(job)
+        if error:
+            self._fail_abandoned(job_id, error)
+            job.update(status='failed', error=error, finished_at=time.time())
+        return job
+
+    @staticmethod
+    def _abandoned(job):
+        """Why an unfinished job can no longer finish, or None"""
+        if job['status'] not in ('queued', 'running'):
+            return None
+        if job['pid'] is not None and not process_alive(job['pid']):
+            return "The export was interrupted (its server process stopped). Please start it again."
+        if job['status'] == 'running' and time.time() - (job['updated_at'] or job['created_at']) > EXPORT_JOB_STALL_TIMEOUT:
+            return "The export stopped making progress. Please start it again."
+        return None
+
+    def _fail_abandoned(self, job_id, error):
+        with closing(self._connect()) as conn, conn:
+            conn.execute(
+                "UPDATE export_jobs SET status = 'failed', error = ?, finished_at = ?"
+                " WHERE job_id = ? AND status IN ('queued', 'running')",
+                (error, time.time(), job_id)
+            )
+
+    def purge_expired(self, ttl):
+        """Remove jobs older than `ttl` seconds together with their files"""
+        with closing(self._connect()) as conn, conn:
+            expired = conn.execute(
+                "SELECT job_id, format FROM export_jobs WHERE created_at < ?", (time.time() - ttl,)
+            ).fetchall()
+            conn.execute("DELETE FROM export_jobs WHERE created_at < ?", (time.time() - ttl,))
+        for job in expired:
+            for path in (self.file_path(job), self.file_path(job) + ".part"):
+                if os.path.exists(path):
+                    os.remove(path)
+
+def process_alive(pid):
+    """Whether a process with this ID exists on this host (export jobs run in the web worker processes)"""
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+export_jobs = ExportJobRegistry(EXPORT_DIR)
+
+def export_job_owner():
+    """Token identifying this browser session as the starter of its export jobs"""
+    if 'export_owner' not in session:
+        session['export_owner'] = secrets.token_urlsafe(16)
+    return session['export_owner']
+
+def get_own_export_job(job_id):
+    """The export job if this browser session started it, otherwise None (so other sessions see a 404)"""
+    job = export_jobs.get(job_id)
+    if job is None or job['owner'] is None or not secrets.compare_digest(job['owner'], export_job_owner()):
+        return None
+    return job
+
+class ExportCache:
+    """Size-bounded on-disk cache of finished export files, indexed in a SQLite file shared by all workers.
+
+    Keys are hashes of what the file contains plus a data version that is bumped whenever a Session
+    in this app commits a donor or transaction change, so those changes take effect immediately.
+    Writes that bypass a Session commit (psql, process_transactions.py, imports) do not bump it:
+    until an entry expires after `ttl` it can still serve rows from before such a write.
+    """
+
+    def __init__(self, directory, max_bytes, ttl):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        os.makedirs(directory, exist_ok=True)
+        self.path = os.path.join(directory, "export_cache.sqlite3")
+        with closing(self._connect()) as conn, conn:
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS export_cache ("
+                " key TEXT PRIMARY KEY, size INTEGER NOT NULL, created_at REAL NOT NULL, last_access REAL NOT NULL)"
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS ix_export_cache_last_access ON export_cache (last_access)")
+            conn.execute("CREATE TABLE IF NOT EXISTS data_version (id INTEGER PRIMARY KEY CHECK (id = 1), version INTEGER NOT NULL)")
+            conn.execute("INSERT OR IGNORE INTO data_version (id, version) VALUES (1, 0)")
+
+    def _connect(self):
+        return sqlite3.connect(self.path, timeout=10)
+
+    def data_version(self):
+        with closing(self._connect()) as conn:
+            return conn.execute("SELECT version FROM data_version WHERE id = 1").fetchone()[0]
+
+    def bump_data_version(self):
+        """Invalidate every cached export (their keys include the old version)"""
+        with closing(self._connect()) as conn, conn:
+            conn.execute("UPDATE data_version SET version = version + 1 WHERE id = 1")
+
+    def key(self, *parts):
+        """Hash of the JSON-serializable parts that determine an export's content, at the current data version"""
+        content = json.dumps([self.data_version(), *parts], sort_keys=True, default=str)
+        return hashlib.sha256(content.encode('utf-8')).hexdigest()
+
+    def file_path(self, key):
+        return os.path.join(self.directory, f"{key}.export")
+
+    def part_path(self, key):
+        """Temporary path to write an export to before store(); unique so concurrent writers don't collide"""
+        return os.path.join(self.directory, f"{key}.{secrets.token_hex(4)}.part")
+
+    def open(self, key):
+        """The cached file for `key` opened for reading, or None
+
+        The file is opened before returning, so eviction by another worker removing it afterwards
+        cannot break the download; if it was already removed this is a cache miss.
+        """
+        now = time.time()
+        with closing(self._connect()) as conn, conn:
+            row = conn.execute("SELECT created_at FROM export_cache WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                return None
+            if now - row[0] <= self.ttl:
+                try:
+                    cached_file = open(self.file_path(key), 'rb')
+                except FileNotFoundError:
+                    pass
+                else:
+                    conn.execute("UPDATE export_cache SET last_access = ? WHERE key = ?", (now, key))
+                    return cached_file
+            conn.execute("DELETE FROM export_cache WHERE key = ?", (key,))
+        return None
+
+    def store(self, key, part_path):
+        """Move a finished file written to part_path into the cache, evict over the size cap, and return its path"""
+        path = self.file_path(key)
+        os.replace(part_path, path)
+        now = time.time()
+        with closing(self._connect()) as conn, conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO export_cache (key, size, created_at, last_access) VALUES (?, ?, ?, ?)",
+                (key, os.path.getsize(path), now, now)
+            )
+            evicted = [row[0] for row in conn.execute("SELECT key FROM export_cache WHERE created_at < ?", (now - self.ttl,))]
+            total = 0
+            for cached_key, size in conn.execute("SELECT key, size FROM export_cache ORDER BY last_access DESC").fetchall():
+                total += size
+                if total > self.max_bytes and cached_key != key:
+                    evicted.append(cached_key)
+            conn.executemany("DELETE FROM export_cache WHERE key = ?", [(cached_key,) for cached_key in evicted])
+        for cached_key in evicted:
+            if os.path.exists(self.file_path(cached_key)):
+                os.remove(self.file_path(cached_key))
+        return path
+
+    def tee(self, key, chunks):
+        """Pass a stream of response chunks through while writing them to the cache
+
+        The file is only stored once the stream has been sent completely; an aborted download
+        leaves nothing behind.
+        """
+        part_path = self.part_path(key)
+        try:
+            with open(part_path, 'wb') as f:
+                for chunk in chunks:
+                    f.write(chunk.encode('utf-8') if isinstance(chunk, str) else chunk)
+                    yield chunk
+            self.store(key, part_path)
+        finally:
+            if os.path.exists(part_path):
+                os.remove(part_path)
+
+    @staticmethod
+    def read_chunks(f, chunk_size=64 * 1024):
+        """Stream an open cached file, closing it at the end"""
+        with f:
+            while True:
+                chunk = f.read(chunk_size)
+                if not chunk:
+                    break
+                yield chunk
+
+export_cache = ExportCache(EXPORT_CACHE_DIR, EXPORT_CACHE_MAX_BYTES, EXPORT_CACHE_TTL)
+
+@event.listens_for(Session, "after_flush")
+def note_export_data_change(session, flush_context):
+    """Remember that this transaction changed donors or transactions, for invalidate_export_cache"""
+    if any(isinstance(obj, (EagleTrustFundDonor, EagleTrustFundTransaction))
+           for obj in (*session.new, *session.dirty, *session.deleted)):
+        session.info['export_data_changed'] = True
+
+@event.listens_for(Session, "do_orm_execute")
+def note_export_bulk_change(orm_execute_state):
+    """Same for bulk INSERT/UPDATE/DELETE statements run through the session"""
+    if orm_execute_state.is_insert or orm_execute_state.is_update or orm_execute_state.is_delete:
+        orm_execute_state.session.info['export_data_changed'] = True
+
+@event.listens_for(Session, "after_commit")
+def invalidate_export_cache(session):
+    if session.info.pop('export_data_changed', False):
+        export_cache.bump_data_version()
+
+@event.listens_for(Session, "after_rollback")
+def forget_export_data_change(session):
+    session.info.pop('export_data_changed', None)
+
+export_executor = ThreadPoolExecutor(max_workers=EXPORT_WORKERS, thread_name_prefix="export")
+
+def cache_search_results(search_params, count, donor_ids=None, page_cursors=None, estimated=False):
+    """Store a new search result set server-side for paging and downloads; the session only keeps the token"""
+    clear_search_session()
+    token = result_store.put({
+        'search_params': search_params,
+        'count': count,
+        'estimated': estimated,
+        'donor_ids': donor_ids,
+        'page_cursors': page_cursors,
+    })
+    session['last_search_results'] = {
+        'token': token,
+        'timestamp': time.time(),
+        'count': count,
+    }
+    return result_store.get(token)
+
+def update_cached_search_results(cached_results, **changes):
+    """Save changes (e.g. newly learned page cursors) to the current search result set"""
+    cached_results.update(changes)
+    result_store.put(cached_results, token=cached_results['token'])
+    if session.get('last_search_results', {}).get('token') == cached_results['token']:
+        session['last_search_results'] = dict(session['last_search_results'], count=cached_results['count'])
+    return cached_results
+
+def get_cached_search_results():
+    """Return the cached result set for the current session, or None if missing or expired"""
+    cached = session.get('last_search_results')
+    if not cached or 'token' not in cached:
+        return None
+    return result_store.get(cached['token'])
+
 def clear_search_session():
     """Clear any existing search results from session to start fresh"""
     if 'last_search_results' in session:
-        del session['last_search_results']
+        cached = session.pop('last_search_results')
+        if cached.get('token'):
+            result_store.discard(cached['token'])
 
 def is_search_session_valid():
     """Check if the current search session is valid and not expired"""
@@ -81,9 +613,9 @@ def is_search_session_valid():
     cached_results = session['last_search_results']
     
     # Check if cached results are still valid (within 30 minutes)
-    if time.time() - cached_results['timestamp'] > 1800:  # 30 minutes
+    if time.time() - cached_results['timestamp'] > RESULT_STORE_TTL:
         # Clean up expired session
-        del session['last_search_results']
+        clear_search_session()
         return False
     
     return True
@@ -94,47 +626,59 @@ def parse_multi_values(value_string):
         return []
     return [v.strip() for v in value_string.split(',') if v.strip()]
 
+def text_search_condition(column, value, match_mode=None):
+    """Build a text match the pg_trgm GIN indexes can serve (see migrations/001_trigram_search_indexes.sql).
+
+    The column is compared bare - no lower()/coalesce() wrapping - so the planner can use the
+    trigram index. 'similar' mode uses the pg_trgm similarity operator to tolerate misspellings.
+    Terms shorter than 3 characters have no trigrams, so they always use a plain substring match.
+    """
+    if match_mode == 'similar' and len(value) >= 3:
+        return column.bool_op('%')(value)
+    return column.ilike(f"%{value}%")
+
 def parse_zip_codes(zip_string):
-    """Parse zip codes supporting both ranges (11111-13333) and individual codes (11111,22222)"""
+    """Parse zip codes supporting both ranges (11111-13333) and individual codes (11111,22222)
+
+    Ranges are not expanded - each entry comes back as a (start, end) pair of digit prefixes,
+    with start == end for an individual code. Entries that are not numeric codes or ranges of
+    up to 5 digits (e.g. foreign postal codes) come back as (part, None) for a text match.
+    """
     if not zip_string:
         return []
     
-    zip_codes = []
+    zip_ranges = []
     parts = [part.strip() for part in zip_string.split(',') if part.strip()]
     
     for part in parts:
         if '-' in part:
             # Handle range (e.g., "11111-13333")
-            range_parts = part.split('-')
-            if len(range_parts) == 2:
-                try:
-                    start_zip = range_parts[0].strip()
-                    end_zip = range_parts[1].strip()
-                    
-                    # Validate that both are numeric and same length
-                    if start_zip.isdigit() and end_zip.isdigit() and len(start_zip) == len(end_zip):
-                        start_num = int(start_zip)
-                        end_num = int(end_zip)
-                        
-                        # Generate range of zip codes
-                        if start_num <= end_num:
-                            zip_length = len(start_zip)
-                            for zip_num in range(start_num, end_num + 1):
-                                zip_codes.append(str(zip_num).zfill(zip_length))
-                    else:
-                        # If not valid range format, treat as individual zip code
-                        zip_codes.append(part)
-                except (ValueError, IndexError):
-                    # If parsing fails, treat as individual zip code
-                    zip_codes.append(part)
+            range_parts = [p.strip() for p in part.split('-')]
+            if (len(range_parts) == 2 and range_parts[0].isdigit() and range_parts[1].isdigit()
+                    and len(range_parts[0]) == len(range_parts[1]) <= 5):
+                # Skip backwards ranges, as before
+                if int(range_parts[0]) <= int(range_parts[1]):
+                    zip_ranges.append((range_parts[0], range_parts[1]))
             else:
-                # If not valid range format, treat as individual zip code
-                zip_codes.append(part)
+                # If not valid range format (e.g. ZIP+4 "63101-1234"), treat as individual zip code
+                zip_ranges.append((part, None))
+        elif part.isdigit() and len(part) <= 5:
+            # Individual zip code or zip prefix
+            zip_ranges.append((part, part))
         else:
-            # Individual zip code
-            zip_codes.append(part)
+            zip_ranges.append((part, None))
     
-    return zip_codes
+    return zip_ranges
+
+def zip_range_condition(start, end):
+    """Index range predicate on zip5 matching every ZIP whose prefix falls between start and end"""
+    conditions = [EagleTrustFundDonor.zip5 >= start]
+    # Exclusive upper bound is the next prefix of the same length ("63199" -> "63200");
+    # an all-nines prefix has no successor and leaves the range open-ended
+    upper = str(int(end) + 1).zfill(len(end))
+    if len(upper) == len(end):
+        conditions.append(EagleTrustFundDonor.zip5 < upper)
+    return and_(*conditions)
 
 def parse_date_range(date_str):
     """Parse date or date range string"""
@@ -181,7 +725,7 @@ def build_search_query(session, search_params):
     query = session.query(EagleTrustFundDonor)
     field_conditions = []
     filter_conditions = []
-    query_joined_transactions = False
+    transaction_conditions = []
     transaction_fields_provided = False
 
     # Add filter conditions first
@@ -207,25 +751,28 @@ def build_search_query(session, search_params):
     # Add search conditions (only if specific search fields are provided)
     search_field_provided = False
     
+    # Name and city matching can be switched to fuzzy (trigram similarity) matching
+    match_mode = search_params.get('match_mode')
+
     # Handle multi-value fields
     if search_params.get('alternate_id'):
-        field_conditions.append(EagleTrustFundDonor.alternate_id.ilike(f"%{search_params['alternate_id']}%"))
+        field_conditions.append(text_search_condition(EagleTrustFundDonor.alternate_id, search_params['alternate_id']))
         search_field_provided = True
     if search_params.get('first_name'):
-        field_conditions.append(EagleTrustFundDonor.first_name.ilike(f"%{search_params['first_name']}%"))
+        field_conditions.append(text_search_condition(EagleTrustFundDonor.first_name, search_params['first_name'], match_mode))
         search_field_provided = True
     if search_params.get('last_name'):
-        field_conditions.append(EagleTrustFundDonor.last_name.ilike(f"%{search_params['last_name']}%"))
+        field_conditions.append(text_search_condition(EagleTrustFundDonor.last_name, search_params['last_name'], match_mode))
         search_field_provided = True
     if search_params.get('email'):
-        field_conditions.append(EagleTrustFundDonor.email_address.ilike(f"%{search_params['email']}%"))
+        field_conditions.append(text_search_condition(EagleTrustFundDonor.email_address, search_params['email']))
         search_field_provided = True
     
     # Handle multiple cities
     if search_params.get('city'):
         cities = parse_multi_values(search_params['city'])
         if cities:
-            city_conditions = [EagleTrustFundDonor.city.ilike(f"%{city}%") for city in cities]
+            city_conditions = [text_search_condition(EagleTrustFundDonor.city, city, match_mode) for city in cities]
             field_conditions.append(or_(*city_conditions))
             search_field_provided = True
     
@@ -239,9 +786,13 @@ def build_search_query(session, search_params):
     
     # Handle multiple zip codes and zip code ranges
     if search_params.get('zip_code'):
-        zip_codes = parse_zip_codes(search_params['zip_code'])
-        if zip_codes:
-            zip_conditions = [EagleTrustFundDonor.zip_plus4.ilike(f"%{zip_code}%") for zip_code in zip_codes]
+        zip_ranges = parse_zip_codes(search_params['zip_code'])
+        if zip_ranges:
+            zip_conditions = [
+                zip_range_condition(start, end) if end is not None
+                else EagleTrustFundDonor.zip_plus4.ilike(f"%{start}%")
+                for start, end in zip_ranges
+            ]
             field_conditions.append(or_(*zip_conditions))
             search_field_provided = True
     
@@ -284,27 +835,27 @@ def build_search_query(session, search_params):
     if search_params.get('date_added_range'):
         start_date, end_date = parse_date_range(search_params['date_added_range'])
         if start_date is not None:
-            field_conditions.append(EagleTrustFundDonor.date_added_to_database >= start_date.strftime('%Y-%m-%d'))
+            field_conditions.append(EagleTrustFundDonor.date_added_to_database >= start_date)
             search_field_provided = True
         if end_date is not None:
-            field_conditions.append(EagleTrustFundDonor.date_added_to_database <= end_date.strftime('%Y-%m-%d'))
+            field_conditions.append(EagleTrustFundDonor.date_added_to_database <= end_date)
             search_field_provided = True
 
     # Handle expiration date range
     if search_params.get('expiration_date_range'):
         start_date, end_date = parse_date_range(search_params['expiration_date_range'])
         if start_date is not None:
-            field_conditions.append(EagleTrustFundDonor.expiration_date >= start_date.strftime('%Y-%m-%d'))
+            field_conditions.append(EagleTrustFundDonor.expiration_date >= start_date)
             search_field_provided = True
         if end_date is not None:
-            field_conditions.append(EagleTrustFundDonor.expiration_date <= end_date.strftime('%Y-%m-%d'))
+            field_conditions.append(EagleTrustFundDonor.expiration_date <= end_date)
             search_field_provided = True
 
     # Process transaction search parameters
     if search_params.get('trans_date'):
         try:
             trans_date_val = datetime.strptime(search_params['trans_date'], '%Y-%m-%d').date()
-            field_conditions.append(EagleTrustFundTransaction.trans_date == trans_date_val)
+            transaction_conditions.append(EagleTrustFundTransaction.trans_date == trans_date_val)
             transaction_fields_provided = True
         except ValueError:
             flash("Invalid transaction date format. Please use YYYY-MM-DD.", "error")
@@ -312,7 +863,7 @@ def build_search_query(session, search_params):
     if search_params.get('trans_amount'):
         try:
             trans_amount_val = Decimal(search_params['trans_amount'])
-            field_conditions.append(EagleTrustFundTransaction.trans_amount == trans_amount_val)
+            transaction_conditions.append(EagleTrustFundTransaction.trans_amount == trans_amount_val)
             transaction_fields_provided = True
         except InvalidOperation:
             flash("Invalid transaction amount format.", "error")
@@ -328,13 +879,18 @@ def build_search_query(session, search_params):
 
     for field_name, field_column in transaction_text_fields:
         if search_params.get(field_name):
-            field_conditions.append(field_column.ilike(f"%{search_params[field_name]}%"))
+            transaction_conditions.append(text_search_condition(field_column, search_params[field_name]))
             transaction_fields_provided = True
 
-    # Join with transactions table if any transaction fields were provided
-    if transaction_fields_provided:
-        query = query.join(EagleTrustFundTransaction, EagleTrustFundDonor.base_donor_id == EagleTrustFundTransaction.base_donor_id).distinct()
-        query_joined_transactions = True
+    # Transaction criteria are one EXISTS semi-join: a donor matches when a single gift meets all of
+    # them, without joining every gift and de-duplicating the wide donor rows with DISTINCT
+    if transaction_conditions:
+        field_conditions.append(
+            exists().where(
+                EagleTrustFundTransaction.base_donor_id == EagleTrustFundDonor.base_donor_id,
+                *transaction_conditions
+            )
+        )
 
     # Apply search conditions only if specific fields were searched
     if field_conditions:
@@ -343,11 +899,116 @@ def build_search_query(session, search_params):
     # Return the query and whether any search field was provided
     return query, search_field_provided or transaction_fields_provided
 
+def visible_result_columns(search_params):
+    """Donor columns the results table shows, i.e. all columns minus hidden_columns"""
+    hidden_columns = set(search_params.get('hidden_columns', '').split(','))
+    return [col_id for col_id in DONOR_RESULT_COLUMNS if col_id not in hidden_columns]
+
+def search_cache_params(search_params):
+    """Search parameters that affect which donors match (column visibility and paging do not)"""
+    return {key: value for key, value in search_params.items() if value and key not in ('hidden_columns', 'page')}
+
+def donor_sort_columns():
+    """Sort order for donor search results, also used as the keyset for pagination"""
+    return (
+        func.coalesce(EagleTrustFundDonor.last_name, ''),
+        func.coalesce(EagleTrustFundDonor.first_name, ''),
+        EagleTrustFundDonor.base_donor_id,
+    )
+
+def fetch_donor_page(query, cursor, with_total=False, columns=None):
+    """Fetch one page of donors after `cursor` (a donor_sort_columns() key) with a keyset seek instead of OFFSET
+
+    Returns (donors, last_key, total). With with_total the number of matches is computed in the
+    same statement with count(*) OVER (); otherwise total is None. If `columns` is given only
+    those donor attributes (plus the primary key) are loaded.
+    """
+    sort_columns = donor_sort_columns()
+    if columns is not None:
+        query = query.options(load_only(EagleTrustFundDonor.base_donor_id, *[getattr(EagleTrustFundDonor, col_id) for col_id in columns]))
+    if cursor:
+        query = query.filter(tuple_(*sort_columns) > tuple_(*cursor))
+    columns = list(sort_columns)
+    if with_total:
+        columns.append(func.count().over())
+    rows = query.add_columns(*columns).order_by(*sort_columns).limit(ITEMS_PER_PAGE).all()
+    donors = [row[0] for row in rows]
+    last_key = list(rows[-1][1:4]) if rows else None
+    total = (rows[0][4] if rows else 0) if with_total else None
+    return donors, last_key, total
+
+def estimate_row_count(query):
+    """Planner's row estimate for a query, read with EXPLAIN (the query itself is not run)"""
+    compiled = query.statement.compile(dialect=engine.dialect, compile_kwargs={"render_postcompile": True})
+    plan = query.session.connection().exec_driver_sql(f"EXPLAIN (FORMAT JSON) {compiled}", compiled.params).scalar()
+    if isinstance(plan, str):
+        plan = json.loads(plan)
+    return int(plan[0]['Plan']['Plan Rows'])
+
+def materialize_search_results(query, cached_results):
+    """Fetch the ordered keys of all matches once: exact count, every page cursor and the donor IDs for downloads"""
+    sort_columns = donor_sort_columns()
+    sort_keys = query.with_entities(*sort_columns).order_by(*sort_columns).all()
+    return update_cached_search_results(
+        cached_results,
+        donor_ids=[key[2] for key in sort_keys],
+        page_cursors=[list(sort_keys[i - 1]) for i in range(ITEMS_PER_PAGE, len(sort_keys), ITEMS_PER_PAGE)],
+        count=len(sort_keys),
+        estimated=False
+    )
+
+def run_donor_search(query, search_params, page):
+    """Return (donors, page, total_results, total_pages, count_is_estimate) for one page of a donor search
+
+    A new search gets its first page and total from a single statement (count(*) OVER ()), or
+    uses the planner's estimate for very broad searches when SEARCH_COUNT_MODE is "estimated".
+    The keyset cursor that ends each page is cached server-side as pages are visited; jumping
+    past the known pages fetches the ordered keys of all matches once. Only the visible columns
+    are loaded.
+    """
+    cache_params = search_cache_params(search_params)
+    columns = visible_result_columns(search_params)
+    cached_results = get_cached_search_results()
+    if cached_results is not None and cached_results['search_params'] != cache_params:
+        cached_results = None
+
+    if cached_results is None:
+        estimated_total = None
+        if SEARCH_COUNT_MODE == 'estimated':
+            estimated_total = estimate_row_count(query)
+            if estimated_total < ESTIMATED_COUNT_THRESHOLD:
+                estimated_total = None
+
+        donors, last_key, total = fetch_donor_page(query, None, with_total=estimated_total is None, columns=columns)
+        cached_results = cache_search_results(
+            cache_params,
+            total if estimated_total is None else estimated_total,
+            page_cursors=[last_key] if len(donors) == ITEMS_PER_PAGE else [],
+            estimated=estimated_total is not None
+        )
+        if page <= 1:
+            total_results = cached_results['count']
+            return donors, 1, total_results, ceil(total_results / ITEMS_PER_PAGE), cached_results['estimated']
+
+    # Pages past the last known cursor need the full key list (this also makes an estimated count exact)
+    if page > 1 and len(cached_results['page_cursors']) < page - 1:
+        cached_results = materialize_search_results(query, cached_results)
+
+    total_results = cached_results['count']
+    total_pages = ceil(total_results / ITEMS_PER_PAGE)
+    page = min(max(page, 1), max(total_pages, 1))
+    page_cursors = cached_results['page_cursors']
+    donors, last_key, _ = fetch_donor_page(query, page_cursors[page - 2] if page > 1 else None, columns=columns)
+    if len(page_cursors) == page - 1 and len(donors) == ITEMS_PER_PAGE:
+        update_cached_search_results(cached_results, page_cursors=page_cursors + [last_key])
+    return donors, page, total_results, total_pages, cached_results['estimated']
+
 @app.route("/", methods=["GET", "POST"])
 def home():
     if request.method == "POST":
-        # Clear any existing search session data to start fresh
-        clear_search_session()
+        # Clear any existing search session data to start fresh (page changes reuse the cached results)
+        if 'page' not in request.form:
+            clear_search_session()
         
         # Get all search parameters
         search_params = {
@@ -360,6 +1021,7 @@ def home():
             'state': request.form.get("state", "").strip(),
             'zip_code': request.form.get("zip_code", "").strip(),
             'phone': request.form.get("phone", "").strip(),
+            'match_mode': request.form.get("match_mode", "").strip(),
             'exclude_deceased': request.form.get("exclude_deceased"),
             'exclude_non_donors': request.form.get("exclude_non_donors"),
             'hidden_columns': request.form.get("hidden_columns", "secondary_title,secondary_first_name,secondary_last_name,secondary_suffix"),
@@ -403,21 +1065,8 @@ def home():
             # Get page number from request
             page = request.form.get('page', 1, type=int)
             
-            # Count total results
-            total_results = query.count()
-            total_pages = ceil(total_results / ITEMS_PER_PAGE)
-            
-            # Store ALL search result IDs in session for downloads (efficient ID-only query)
-            all_donor_ids = [row[0] for row in query.with_entities(EagleTrustFundDonor.base_donor_id).all()]
-            session['last_search_results'] = {
-                'donor_ids': all_donor_ids,
-                'timestamp': time.time(),
-                'count': len(all_donor_ids),
-                'search_params': search_params  # Store for verification
-            }
-            
-            # Apply pagination for display
-            results = query.offset((page - 1) * ITEMS_PER_PAGE).limit(ITEMS_PER_PAGE).all()
+            # Fetch the requested page (results are cached server-side for paging and downloads)
+            results, page, total_results, total_pages, count_is_estimate = run_donor_search(query, search_params, page)
 
             # If only one result found, redirect to that donor's page
             if total_results == 1:
@@ -432,7 +1081,9 @@ def home():
                 search_params=search_params,
                 current_page=page,
                 total_pages=total_pages,
-                total_results=total_results
+                total_results=total_results,
+                count_is_estimate=count_is_estimate,
+                all_columns=DONOR_RESULT_COLUMNS
             )
 
         finally:
@@ -470,21 +1121,8 @@ def refine_search():
         # Get page number from request
         page = request.form.get('page', 1, type=int)
         
-        # Count total results
-        total_results = query.count()
-        total_pages = ceil(total_results / ITEMS_PER_PAGE)
-        
-        # Store ALL search result IDs in session for downloads (efficient ID-only query)
-        all_donor_ids = [row[0] for row in query.with_entities(EagleTrustFundDonor.base_donor_id).all()]
-        session['last_search_results'] = {
-            'donor_ids': all_donor_ids,
-            'timestamp': time.time(),
-            'count': len(all_donor_ids),
-            'search_params': search_params  # Store for verification
-        }
-        
-        # Apply pagination
-        results = query.offset((page - 1) * ITEMS_PER_PAGE).limit(ITEMS_PER_PAGE).all()
+        # Fetch the requested page (results are cached server-side for paging and downloads)
+        results, page, total_results, total_pages, count_is_estimate = run_donor_search(query, search_params, page)
         
         return render_template(
             "search_results.html", 
@@ -492,7 +1130,9 @@ def refine_search():
             search_params=search_params,
             current_page=page,
             total_pages=total_pages,
-            total_results=total_results
+            total_results=total_results,
+            count_is_estimate=count_is_estimate,
+            all_columns=DONOR_RESULT_COLUMNS
         )
     finally:
         db_session.close()
@@ -529,21 +1169,8 @@ def toggle_column():
         # Get page number from request
         page = request.form.get('page', 1, type=int)
         
-        # Count total results
-        total_results = query.count()
-        total_pages = ceil(total_results / ITEMS_PER_PAGE)
-        
-        # Store ALL search result IDs in session for downloads (efficient ID-only query)
-        all_donor_ids = [row[0] for row in query.with_entities(EagleTrustFundDonor.base_donor_id).all()]
-        session['last_search_results'] = {
-            'donor_ids': all_donor_ids,
-            'timestamp': time.time(),
-            'count': len(all_donor_ids),
-            'search_params': search_params  # Store for verification
-        }
-        
-        # Apply pagination
-        results = query.offset((page - 1) * ITEMS_PER_PAGE).limit(ITEMS_PER_PAGE).all()
+        # Fetch the requested page (results are cached server-side for paging and downloads)
+        results, page, total_results, total_pages, count_is_estimate = run_donor_search(query, search_params, page)
         
         return render_template(
             "search_results.html", 
@@ -551,7 +1178,9 @@ def toggle_column():
             search_params=search_params,
             current_page=page,
             total_pages=total_pages,
-            total_results=total_results
+            total_results=total_results,
+            count_is_estimate=count_is_estimate,
+            all_columns=DONOR_RESULT_COLUMNS
         )
     finally:
         db_session.close()
@@ -817,19 +1446,19 @@ def add_transaction(donor_id):
 
             # Update donor's transaction summary fields
             # Update latest transaction
-            if donor.latest_date is None or trans_date > parse_date(donor.latest_date):
-                donor.latest_date = trans_date.strftime('%Y-%m-%d')
+            if donor.latest_date is None or trans_date > donor.latest_date:
+                donor.latest_date = trans_date
                 donor.latest_amount = trans_amount
                 
             # Update largest transaction
             if donor.largest_amount is None or trans_amount > donor.largest_amount:
                 donor.largest_amount = trans_amount
-                donor.largest_date = trans_date.strftime('%Y-%m-%d')
+                donor.largest_date = trans_date
 
             # Update first/inception transaction
-            if donor.inception_date is None or trans_date < parse_date(donor.inception_date):
+            if donor.inception_date is None or trans_date < donor.inception_date:
                 donor.inception_amount = trans_amount
-                donor.inception_date = trans_date.strftime('%Y-%m-%d')
+                donor.inception_date = trans_date
 
             # Update total amounts and response counts
             donor.total_dollar_amount = (donor.total_dollar_amount or Decimal('0')) + trans_amount
@@ -1008,13 +1637,252 @@ def donor_quick_add():
     finally:
         session.close()
 
+# Per-row fields of the batch entry form (submitted as <field>_<row number>)
+BATCH_ROW_FIELDS = ('donor_id', 'trans_amount', 'appeal_code', 'payment_type',
+                    'bluebook_job_description', 'bluebook_list_description')
+
+def validate_batch_rows(session, raw_rows):
+    """Validate batch entry rows, checking all donor IDs with one query
+
+    `raw_rows` is a list of (row number, {field: submitted string}) for BATCH_ROW_FIELDS.
+    Returns (transactions, errors): a dict of column values per valid non-empty row, and
+    {row number: "Row N: ..." message} for the invalid rows, in row order.
+    """
+    parsed = []
+    errors = {}
+    for i, fields in raw_rows:
+        donor_id_str = (fields.get('donor_id') or '').strip()
+        amount_str = (fields.get('trans_amount') or '').strip()
+        
+        # Skip empty rows
+        if not donor_id_str and not amount_str:
+            continue
+        
+        # Validate donor ID
+        if not donor_id_str:
+            errors[i] = f"Row {i}: Donor ID is required"
+            continue
+        try:
+            donor_id = int(donor_id_str)
+        except ValueError:
+            errors[i] = f"Row {i}: Invalid donor ID '{donor_id_str}'"
+            continue
+        parsed.append((i, donor_id, amount_str, fields))
+    
+    donor_ids = {donor_id for _, donor_id, _, _ in parsed}
+    existing_ids = {
+        donor_id for (donor_id,) in
+        session.query(EagleTrustFundDonor.base_donor_id).filter(EagleTrustFundDonor.base_donor_id.in_(donor_ids))
+    } if donor_ids else set()
+    
+    transactions = []
+    for i, donor_id, amount_str, fields in parsed:
+        if donor_id not in existing_ids:
+            errors[i] = f"Row {i}: Donor #{donor_id} not found"
+            continue
+        
+        # Validate amount
+        if not amount_str:
+            errors[i] = f"Row {i}: Transaction amount is required"
+            continue
+        try:
+            trans_amount = Decimal(amount_str)
+        except InvalidOperation:
+            errors[i] = f"Row {i}: Invalid transaction amount '{amount_str}'"
+            continue
+        if trans_amount < 0:
+            errors[i] = f"Row {i}: Transaction amount cannot be negative"
+            continue
+        
+        transactions.append({
+            'base_donor_id': donor_id,
+            'trans_amount': trans_amount,
+            'appeal_code': (fields.get('appeal_code') or '').strip() or None,
+            'payment_type': (fields.get('payment_type') or '').strip() or None,
+            'bluebook_job_description': (fields.get('bluebook_job_description') or '').strip() or None,
+            'bluebook_list_description': (fields.get('bluebook_list_description') or '').strip() or None,
+        })
+    
+    return transactions, {i: errors[i] for i in sorted(errors)}
+
+def batch_content_hashes(transactions, trans_date, update_batch_num):
+    """Hash of (donor, date, amount, batch, occurrence) per row, or None for each row outside a numbered batch
+
+    The occurrence number keeps two identical checks in one submission distinct, while the same
+    rows submitted again produce the same hashes and hit ux_transactions_content_hash. Occurrences
+    restart with each submission, so a gift entered again in a later sitting also collides; the
+    entry page then offers "add anyway" (allow_duplicates, stored without a hash).
+    """
+    if not update_batch_num:
+        return [None] * len(transactions)
+    occurrences = {}
+    hashes = []
+    for transaction in transactions:
+        content = (transaction['base_donor_id'], trans_date.isoformat(), str(transaction['trans_amount']), update_batch_num)
+        occurrences[content] = occurrences.get(content, 0) + 1
+        hashes.append(hashlib.sha256(json.dumps([*content, occurrences[content]]).encode('utf-8')).hexdigest())
+    return hashes
+
+def insert_batch_transactions(session, transactions, trans_date, update_batch_num, payment_method, allow_duplicates=False):
+    """Insert a batch of transactions and roll them into the donor summary columns (not committed)
+
+    `transactions` are the dicts from validate_batch_rows, all dated `trans_date`. The rows go in as
+    one multi-row INSERT ... RETURNING and every affected donor is updated by one
+    UPDATE ... FROM (VALUES ...), so the cost does not grow with rows x donors. Returns the new
+    transaction IDs in row order. With `allow_duplicates` the rows get no content hash, so they are
+    added even if the same gifts are already in the batch.
+    """
+    if allow_duplicates:
+        content_hashes = [None] * len(transactions)
+    else:
+        content_hashes = batch_content_hashes(transactions, trans_date, update_batch_num)
+    transaction_ids = session.scalars(
+        insert(EagleTrustFundTransaction).returning(EagleTrustFundTransaction.transaction_id, sort_by_parameter_order=True),
+        [dict(transaction, trans_date=trans_date, update_batch_num=update_batch_num, payment_method=payment_method,
+              content_hash=content_hash)
+         for transaction, content_hash in zip(transactions, content_hashes)]
+    ).all()
+    
+    # Per donor: the first amount in row order (the one that becomes latest/inception, as when rows were
+    # applied one by one), the largest amount, the sum and the response counts
+    summaries = {}
+    for transaction in transactions:
+        amount = transaction['trans_amount']
+        summary = summaries.get(transaction['base_donor_id'])
+        if summary is None:
+            summaries[transaction['base_donor_id']] = [amount, amount, amount, 1, 1 if amount > 0 else 0]
+        else:
+            summary[1] = max(summary[1], amount)
+            summary[2] += amount
+            summary[3] += 1
+            summary[4] += 1 if amount > 0 else 0
+    
+    batch = values(
+        column('base_donor_id', Integer), column('first_amount', Numeric(10, 2)), column('max_amount', Numeric(10, 2)),
+        column('total_amount', Numeric(10, 2)), column('responses', Integer), column('responses_non_zero', Integer),
+        name='batch'
+    ).data([(donor_id, *summary) for donor_id, summary in summaries.items()])
+    
+    donor = EagleTrustFundDonor
+    batch_date = literal(trans_date, Date)
+    is_latest = or_(donor.latest_date.is_(None), batch_date > donor.latest_date)
+    is_largest = or_(donor.largest_amount.is_(None), batch.c.max_amount > donor.largest_amount)
+    is_inception = or_(donor.inception_date.is_(None), batch_date < donor.inception_date)
+    session.execute(
+        update(donor)
+        .where(donor.base_donor_id == batch.c.base_donor_id)
+        .values(
+            latest_date=case((is_latest, batch_date), else_=donor.latest_date),
+            latest_amount=case((is_latest, batch.c.first_amount), else_=donor.latest_amount),
+            largest_amount=case((is_largest, batch.c.max_amount), else_=donor.largest_amount),
+            largest_date=case((is_largest, batch_date), else_=donor.largest_date),
+            inception_amount=case((is_inception, batch.c.first_amount), else_=donor.inception_amount),
+            inception_date=case((is_inception, batch_date), else_=donor.inception_date),
+            total_dollar_amount=func.coalesce(donor.total_dollar_amount, 0) + batch.c.total_amount,
+            total_responses_includes_zero=func.coalesce(donor.total_responses_includes_zero, 0) + batch.c.responses,
+            total_responses_non_zero=func.coalesce(donor.total_responses_non_zero, 0) + batch.c.responses_non_zero,
+        )
+        .execution_options(synchronize_session=False)
+    )
+    return transaction_ids
+
+class BatchTokenReusedError(Exception):
+    """A submission token that was already committed with different batch content"""
+
+def batch_payload_hash(trans_date, update_batch_num, payment_method, raw_rows):
+    """Hash of what a batch submission contains: the settings and the non-empty rows in order
+
+    Computed from the submitted strings (before any database lookup), ignoring row numbers and
+    surrounding whitespace and comparing amounts as numbers, so a replay of the same form or
+    draft hashes the same.
+    """
+    rows = []
+    for _, fields in raw_rows:
+        row = [str(fields.get(field) or '').strip() for field in BATCH_ROW_FIELDS]
+        # Skip empty rows, as validate_batch_rows does
+        if not row[0] and not row[1]:
+            continue
+        try:
+            row[1] = str(Decimal(row[1]).normalize())
+        except InvalidOperation:
+            pass
+        rows.append(row)
+    content = [trans_date.isoformat(), update_batch_num or None, payment_method or None, rows]
+    return hashlib.sha256(json.dumps(content).encode('utf-8')).hexdigest()
+
+def find_batch_submission(session, submission_token, payload_hash):
+    """The committed submission for a token (one primary key lookup), or None
+
+    Raises BatchTokenReusedError if the token was committed with different content, e.g. a form
+    restored by the Back button and filled in with a new batch.
+    """
+    submission = session.get(EagleTrustFundBatchSubmission, submission_token)
+    if submission is not None and submission.payload_hash != payload_hash:
+        raise BatchTokenReusedError(submission_token)
+    return submission
+
+def commit_batch_submission(session, submission_token, payload_hash, transactions, trans_date, update_batch_num, payment_method,
+                            allow_duplicates=False):
+    """Insert and commit a batch once per submission token; returns (submission, replayed)
+
+    A token that was already committed with the same payload returns its original submission
+    without touching the transactions; with a different payload it raises BatchTokenReusedError.
+    Raises IntegrityError if the rows duplicate batch rows committed earlier under another token
+    (see is_duplicate_batch_error), unless `allow_duplicates` is set.
+    """
+    submission = find_batch_submission(session, submission_token, payload_hash)
+    if submission is not None:
+        return submission, True
+    
+    submission = EagleTrustFundBatchSubmission(
+        submission_token=submission_token,
+        payload_hash=payload_hash,
+        update_batch_num=update_batch_num,
+        num_transactions=len(transactions),
+        total_amount=sum(t['trans_amount'] for t in transactions)
+    )
+    try:
+        session.add(submission)
+        insert_batch_transactions(session, transactions, trans_date, update_batch_num, payment_method, allow_duplicates)
+        session.commit()
+        forget_batch_summary(update_batch_num)
+        return submission, False
+    except IntegrityError:
+        session.rollback()
+        # A concurrent replay of the same submission may have committed first
+        submission = find_batch_submission(session, submission_token, payload_hash)
+        if submission is not None:
+            return submission, True
+        raise
+
+def batch_success_url(submission):
+    return url_for("batch_success",
+                   batch_num=submission.update_batch_num or 'NOBATCH',
+                   num_transactions=submission.num_transactions,
+                   total_amount=float(submission.total_amount))
+
+def is_duplicate_batch_error(error):
+    """Whether an exception is a batch row colliding with ux_transactions_content_hash"""
+    diag = getattr(getattr(error, 'orig', None), 'diag', None)
+    return isinstance(error, IntegrityError) and getattr(diag, 'constraint_name', None) == 'ux_transactions_content_hash'
+
+def reused_token_message():
+    return "This form was already submitted as an earlier batch, so these entries were not saved. Please review them and submit again."
+
+def duplicate_batch_message(update_batch_num):
+    return (f"These transactions are already in batch {update_batch_num}. Nothing was added; check the existing batch before entering it again. "
+            "If they really are new gifts with the same donor and amount, tick \"Add anyway\" and submit again.")
+
 @app.route("/batch_transactions", methods=["GET", "POST"])
 def batch_transactions():
     if request.method == "POST":
+        submission_token = request.form.get('submission_token', '').strip() or secrets.token_urlsafe(16)
+        
         # Get global settings
         trans_date_str = request.form.get('global_trans_date', '').strip()
         update_batch_num = request.form.get('global_update_batch_num', '').strip() or None
         payment_method = request.form.get('global_payment_method', '').strip() or None
+        allow_duplicates = request.form.get('allow_duplicates') == '1'
         
         # Validate global trans_date
         trans_date = parse_date(trans_date_str)
@@ -1022,7 +1890,7 @@ def batch_transactions():
             flash("Transaction date is required and must be in YYYY-MM-DD format.", "error")
             return render_template("batch_transactions.html", form_data=request.form)
         
-        # Get number of transaction rows
+        # Get number of transaction rows (also used to recreate the same rows if the form is shown again)
         max_row = 0
         for key in request.form.keys():
             if key.startswith('donor_id_'):
@@ -1036,93 +1904,29 @@ def batch_transactions():
             flash("Please add at least one transaction.", "warning")
             return render_template("batch_transactions.html", form_data=request.form)
         
+        raw_rows = []
+        for i in range(1, max_row + 1):
+            raw_rows.append((i, {field: request.form.get(f'{field}_{i}', '') for field in BATCH_ROW_FIELDS}))
+        payload_hash = batch_payload_hash(trans_date, update_batch_num, payment_method, raw_rows)
+        
         session = Session()
         try:
-            transactions_to_add = []
-            donors_to_update = {}
-            errors = []
+            # A replayed submission (double click, browser retry) gets the original result
+            submission = find_batch_submission(session, submission_token, payload_hash)
+            if submission is not None:
+                return redirect(batch_success_url(submission))
             
-            # Process each transaction row
-            for i in range(1, max_row + 1):
-                donor_id_str = request.form.get(f'donor_id_{i}', '').strip()
-                amount_str = request.form.get(f'trans_amount_{i}', '').strip()
-                appeal_code = request.form.get(f'appeal_code_{i}', '').strip() or None
-                payment_type = request.form.get(f'payment_type_{i}', '').strip() or None
-                job_description = request.form.get(f'bluebook_job_description_{i}', '').strip() or None
-                list_description = request.form.get(f'bluebook_list_description_{i}', '').strip() or None
-                
-                # Skip empty rows
-                if not donor_id_str and not amount_str:
-                    continue
-                
-                # Validate donor ID
-                if not donor_id_str:
-                    errors.append(f"Row {i}: Donor ID is required")
-                    continue
-                
-                try:
-                    donor_id = int(donor_id_str)
-                except ValueError:
-                    errors.append(f"Row {i}: Invalid donor ID '{donor_id_str}'")
-                    continue
-                
-                # Check if donor exists
-                donor = session.query(EagleTrustFundDonor).filter_by(base_donor_id=donor_id).first()
-                if not donor:
-                    errors.append(f"Row {i}: Donor #{donor_id} not found")
-                    continue
-                
-                # Validate amount
-                if not amount_str:
-                    errors.append(f"Row {i}: Transaction amount is required")
-                    continue
-                
-                try:
-                    trans_amount = Decimal(amount_str)
-                    if trans_amount < 0:
-                        errors.append(f"Row {i}: Transaction amount cannot be negative")
-                        continue
-                except InvalidOperation:
-                    errors.append(f"Row {i}: Invalid transaction amount '{amount_str}'")
-                    continue
-                
-                # Create transaction object
-                new_transaction = EagleTrustFundTransaction(
-                    base_donor_id=donor_id,
-                    trans_date=trans_date,
-                    trans_amount=trans_amount,
-                    appeal_code=appeal_code,
-                    payment_type=payment_type,
-                    update_batch_num=update_batch_num,
-                    bluebook_job_description=job_description,
-                    bluebook_list_description=list_description,
-                    payment_method=payment_method
-                )
-                
-                transactions_to_add.append(new_transaction)
-                
-                # Track donors that need summary updates
-                if donor_id not in donors_to_update:
-                    donors_to_update[donor_id] = donor
+            # Validate every row against the database at once (one donor existence query)
+            transactions_to_add, errors = validate_batch_rows(session, raw_rows)
             
             # If there were validation errors, return with errors but preserve form data
             if errors:
-                for error in errors:
+                for error in errors.values():
                     flash(error, "error")
                 
                 # Preserve all form data including transaction rows
                 preserved_data = dict(request.form)
                 
-                # Get the max row number to recreate the same structure
-                max_row = 0
-                for key in request.form.keys():
-                    if key.startswith('donor_id_'):
-                        try:
-                            row_num = int(key.split('_')[-1])
-                            max_row = max(max_row, row_num)
-                        except ValueError:
-                            continue
-                
                 preserved_data['max_row'] = max_row
                 return render_template("batch_transactions.html", form_data=preserved_data)
             
@@ -1130,70 +1934,230 @@ def batch_transactions():
                 flash("No valid transactions to process.", "warning")
                 return render_template("batch_transactions.html", form_data=request.form)
             
-            # Add all transactions to session
-            for transaction in transactions_to_add:
-                session.add(transaction)
-            
-            # Update donor summary fields for each affected donor
-            for donor_id, donor in donors_to_update.items():
-                donor_transactions = [t for t in transactions_to_add if t.base_donor_id == donor_id]
-                
-                for transaction in donor_transactions:
-                    # Update latest transaction
-                    if donor.latest_date is None or trans_date > parse_date(donor.latest_date):
-                        donor.latest_date = trans_date.strftime('%Y-%m-%d')
-                        donor.latest_amount = transaction.trans_amount
-                    
-                    # Update largest transaction
-                    if donor.largest_amount is None or transaction.trans_amount > donor.largest_amount:
-                        donor.largest_amount = transaction.trans_amount
-                        donor.largest_date = trans_date.strftime('%Y-%m-%d')
-                    
-                    # Update first/inception transaction
-                    if donor.inception_date is None or trans_date < parse_date(donor.inception_date):
-                        donor.inception_amount = transaction.trans_amount
-                        donor.inception_date = trans_date.strftime('%Y-%m-%d')
-                    
-                    # Update total amounts and response counts
-                    donor.total_dollar_amount = (donor.total_dollar_amount or Decimal('0')) + transaction.trans_amount
-                    donor.total_responses_includes_zero = (donor.total_responses_includes_zero or 0) + 1
-                    if transaction.trans_amount > 0:
-                        donor.total_responses_non_zero = (donor.total_responses_non_zero or 0) + 1
-            
-            # Commit all changes
-            session.commit()
+            # One multi-row INSERT for the transactions and one UPDATE for the donor summaries
+            # (committed once per submission token)
+            submission, _ = commit_batch_submission(
+                session, submission_token, payload_hash, transactions_to_add, trans_date, update_batch_num, payment_method,
+                allow_duplicates
+            )
             
             # Redirect to batch success page with batch information
-            return redirect(url_for("batch_success", 
-                                  batch_num=update_batch_num or 'NOBATCH',
-                                  num_transactions=len(transactions_to_add),
-                                  total_amount=float(sum(t.trans_amount for t in transactions_to_add))))
+            return redirect(batch_success_url(submission))
             
+        except BatchTokenReusedError:
+            flash(reused_token_message(), "error")
+            # A fresh token lets the clerk submit these entries as a new batch
+            preserved_data = dict(request.form, submission_token=secrets.token_urlsafe(16))
+            preserved_data['max_row'] = max_row
+            return render_template("batch_transactions.html", form_data=preserved_data)
         except Exception as e:
             session.rollback()
-            app.logger.error(f"Error processing batch transactions: {e}")
-            flash(f"Error processing batch transactions: {e}", "error")
-            
             # Preserve all form data including transaction rows
             preserved_data = dict(request.form)
-            
-            # Get the max row number to recreate the same structure
-            max_row = 0
-            for key in request.form.keys():
-                if key.startswith('donor_id_'):
-                    try:
-                        row_num = int(key.split('_')[-1])
-                        max_row = max(max_row, row_num)
-                    except ValueError:
-                        continue
+            if is_duplicate_batch_error(e):
+                flash(duplicate_batch_message(update_batch_num), "error")
+                preserved_data['duplicate_batch'] = True
+            else:
+                app.logger.error(f"Error processing batch transactions: {e}")
+                flash(f"Error processing batch transactions: {e}", "error")
             
             preserved_data['max_row'] = max_row
             return render_template("batch_transactions.html", form_data=preserved_data)
         finally:
             session.close()
     
-    # GET request - show empty form
-    return render_template("batch_transactions.html", form_data={})
+    # GET request - show empty form (with the token that identifies its submission)
+    return render_template("batch_transactions.html", form_data={'submission_token': secrets.token_urlsafe(16)})
+
+class BatchDraftStore:
+    """Draft batches for the JSON batch API, kept in a SQLite file so every worker process sees them.
+
+    A draft holds the batch settings and the rows accepted so far as submitted (keyed by row
+    number, so a resent chunk replaces its rows). Drafts, committed or not, are removed after
+    `ttl` seconds.
+    """
+
+    def __init__(self, path, ttl):
+        self.path = path
+        self.ttl = ttl
+        with closing(self._connect()) as conn, conn:
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS batch_drafts ("
+                " draft_id TEXT PRIMARY KEY, settings TEXT NOT NULL, created_at REAL NOT NULL)"
+            )
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS batch_draft_rows ("
+                " draft_id TEXT NOT NULL, row_num INTEGER NOT NULL, fields TEXT NOT NULL,"
+                " PRIMARY KEY (draft_id, row_num))"
+            )
+
+    def _connect(self):
+        return sqlite3.connect(self.path, timeout=10)
+
+    def create(self, settings):
+        draft_id = secrets.token_urlsafe(12)
+        now = time.time()
+        with closing(self._connect()) as conn, conn:
+            expired = [(row[0],) for row in conn.execute("SELECT draft_id FROM batch_drafts WHERE created_at < ?", (now - self.ttl,))]
+            conn.executemany("DELETE FROM batch_draft_rows WHERE draft_id = ?", expired)
+            conn.executemany("DELETE FROM batch_drafts WHERE draft_id = ?", expired)
+            conn.execute(
+                "INSERT INTO batch_drafts (draft_id, settings, created_at) VALUES (?, ?, ?)",
+                (draft_id, json.dumps(settings), now)
+            )
+        return draft_id
+
+    def get(self, draft_id):
+        """The draft's settings, or None if it does not exist (or has expired)"""
+        with closing(self._connect()) as conn:
+            row = conn.execute("SELECT settings, created_at FROM batch_drafts WHERE draft_id = ?", (draft_id,)).fetchone()
+        if row is None or time.time() - row[1] > self.ttl:
+            return None
+        return json.loads(row[0])
+
+    def put_rows(self, draft_id, rows):
+        """Add (row number, fields) pairs to a draft; returns the draft's row count"""
+        with closing(self._connect()) as conn, conn:
+            conn.executemany(
+                "INSERT OR REPLACE INTO batch_draft_rows (draft_id, row_num, fields) VALUES (?, ?, ?)",
+                [(draft_id, row_num, json.dumps(fields)) for row_num, fields in rows]
+            )
+            return conn.execute("SELECT count(*) FROM batch_draft_rows WHERE draft_id = ?", (draft_id,)).fetchone()[0]
+
+    def drop_rows(self, draft_id, row_nums):
+        """Remove rows from a draft (e.g. an accepted row that was resent and is now invalid)"""
+        with closing(self._connect()) as conn, conn:
+            conn.executemany(
+                "DELETE FROM batch_draft_rows WHERE draft_id = ? AND row_num = ?",
+                [(draft_id, row_num) for row_num in row_nums]
+            )
+
+    def rows(self, draft_id):
+        """All (row number, fields) pairs of a draft in row order"""
+        with closing(self._connect()) as conn:
+            return [
+                (row_num, json.loads(fields)) for row_num, fields in conn.execute(
+                    "SELECT row_num, fields FROM batch_draft_rows WHERE draft_id = ? ORDER BY row_num", (draft_id,)
+                )
+            ]
+
+    def discard(self, draft_id):
+        with closing(self._connect()) as conn, conn:
+            conn.execute("DELETE FROM batch_draft_rows WHERE draft_id = ?", (draft_id,))
+            conn.execute("DELETE FROM batch_drafts WHERE draft_id = ?", (draft_id,))
+
+batch_drafts = BatchDraftStore(BATCH_DRAFT_PATH, BATCH_DRAFT_TTL)
+
+@app.route("/api/batches", methods=["POST"])
+def create_batch_draft():
+    """JSON batch API: start a draft batch from the global settings (trans_date, update_batch_num, payment_method)"""
+    payload = request.get_json(silent=True) or {}
+    trans_date = parse_date(str(payload.get('trans_date') or '').strip())
+    if not trans_date:
+        return jsonify({'error': "Transaction date is required and must be in YYYY-MM-DD format."}), 400
+    
+    draft_id = batch_drafts.create({
+        # The entry page's token; drafts created without one are idempotent per draft
+        'submission_token': str(payload.get('submission_token') or '').strip() or None,
+        'trans_date': trans_date.isoformat(),
+        'update_batch_num': str(payload.get('update_batch_num') or '').strip() or None,
+        'payment_method': str(payload.get('payment_method') or '').strip() or None,
+    })
+    return jsonify({'draft_id': draft_id}), 201
+
+@app.route("/api/batches/<draft_id>/rows", methods=["POST"])
+def add_batch_draft_rows(draft_id):
+    """JSON batch API: validate a chunk of rows and add the valid ones to the draft
+
+    Each row is an object with a "row" number and the BATCH_ROW_FIELDS. Invalid rows are reported
+    (as "Row N: ..." messages) and not stored; sending the same row number again replaces it, and
+    an invalid resend removes the earlier version.
+    """
+    if batch_drafts.get(draft_id) is None:
+        return jsonify({'error': "Draft batch not found or expired."}), 404
+    
+    rows = (request.get_json(silent=True) or {}).get('rows')
+    if not isinstance(rows, list) or not rows:
+        return jsonify({'error': "Expected a non-empty list of rows."}), 400
+    if len(rows) > BATCH_API_MAX_CHUNK_ROWS:
+        return jsonify({'error': f"At most {BATCH_API_MAX_CHUNK_ROWS} rows can be sent per request."}), 400
+    
+    raw_rows = []
+    for row in rows:
+        if not isinstance(row, dict) or not isinstance(row.get('row'), int):
+            return jsonify({'error': "Every row needs an integer \"row\" number."}), 400
+        raw_rows.append((row['row'], {
+            field: '' if row.get(field) is None else str(row[field]) for field in BATCH_ROW_FIELDS
+        }))
+    if len({row_num for row_num, _ in raw_rows}) != len(raw_rows):
+        return jsonify({'error': "Each row number can only appear once per request."}), 400
+    
+    session = Session()
+    try:
+        _, errors = validate_batch_rows(session, raw_rows)
+    finally:
+        session.close()
+    
+    # A resent row that is now invalid must not leave its earlier accepted version in the draft
+    batch_drafts.drop_rows(draft_id, errors.keys())
+    accepted = [(row_num, fields) for row_num, fields in raw_rows if row_num not in errors]
+    row_count = batch_drafts.put_rows(draft_id, accepted)
+    return jsonify({'accepted': len(accepted), 'errors': list(errors.values()), 'row_count': row_count})
+
+@app.route("/api/batches/<draft_id>/commit", methods=["POST"])
+def commit_batch_draft(draft_id):
+    """JSON batch API: insert every row of the draft in one database transaction
+
+    Send {"allow_duplicates": true} to add rows that collide with gifts already in the batch.
+    """
+    payload = request.get_json(silent=True) or {}
+    settings = batch_drafts.get(draft_id)
+    if settings is None:
+        return jsonify({'error': "Draft batch not found or expired."}), 404
+    # Drafts created before submission tokens have none; they are idempotent per draft
+    submission_token = settings.get('submission_token') or draft_id
+    
+    raw_rows = batch_drafts.rows(draft_id)
+    trans_date = parse_date(settings['trans_date'])
+    payload_hash = batch_payload_hash(trans_date, settings['update_batch_num'], settings['payment_method'], raw_rows)
+    
+    session = Session()
+    try:
+        # A replayed commit returns the original result
+        submission = find_batch_submission(session, submission_token, payload_hash)
+        if submission is None:
+            # Donors may have changed since the chunks were checked, so the whole draft is validated again
+            transactions, errors = validate_batch_rows(session, raw_rows)
+            if errors:
+                return jsonify({'errors': list(errors.values())}), 400
+            if not transactions:
+                return jsonify({'error': "No valid transactions to process."}), 400
+            
+            submission, _ = commit_batch_submission(
+                session, submission_token, payload_hash, transactions, trans_date,
+                settings['update_batch_num'], settings['payment_method'], payload.get('allow_duplicates') is True
+            )
+        result = {'num_transactions': submission.num_transactions, 'redirect_url': batch_success_url(submission)}
+    except BatchTokenReusedError:
+        # The page takes the fresh token, so resubmitting creates a new batch
+        return jsonify({'errors': [reused_token_message()], 'submission_token': secrets.token_urlsafe(16)}), 409
+    except Exception as e:
+        session.rollback()
+        if is_duplicate_batch_error(e):
+            return jsonify({'errors': [duplicate_batch_message(settings['update_batch_num'])], 'duplicate': True}), 409
+        app.logger.error(f"Error committing batch draft {draft_id}: {e}")
+        return jsonify({'error': f"Error processing batch transactions: {e}"}), 500
+    finally:
+        session.close()
+    
+    # The draft stays until it expires, so a retried commit hashes the same rows and finds its token
+    return jsonify(result)
+
+@app.route("/api/batches/<draft_id>", methods=["DELETE"])
+def discard_batch_draft(draft_id):
+    """JSON batch API: drop a draft without committing it"""
+    batch_drafts.discard(draft_id)
+    return jsonify({'discarded': True})
 
 @app.route("/batch_success")
 def batch_success():
@@ -1207,27 +2171,28 @@ def batch_success():
     
     session = Session()
     try:
-        # Get all donor IDs from the batch that have mailing_list_status = FALSE
-        if batch_num:
-            # Find transactions in this batch
-            batch_transactions = session.query(EagleTrustFundTransaction).filter_by(
-                update_batch_num=batch_num
-            ).all()
-            
-            # Get unique donor IDs from this batch
-            donor_ids_in_batch = list(set([t.base_donor_id for t in batch_transactions]))
-        else:
-            # If no batch number, we can't identify specific donors
-            donor_ids_in_batch = []
-        
-        # Find donors from this batch who have mailing_list_status = FALSE
+        # Donors from this batch who have mailing_list_status = FALSE, in one query: the batch's
+        # transactions are only probed (EXISTS on ix_transactions_update_batch_num), and only the
+        # columns the page shows are loaded. Without a batch number we can't identify specific donors.
         mailing_list_candidates = []
-        if donor_ids_in_batch:
-            mailing_list_candidates = session.query(EagleTrustFundDonor).filter(
-                and_(
-                    EagleTrustFundDonor.base_donor_id.in_(donor_ids_in_batch),
-                    EagleTrustFundDonor.mailing_list_status == False
+        if batch_num:
+            in_batch = exists().where(
+                EagleTrustFundTransaction.base_donor_id == EagleTrustFundDonor.base_donor_id,
+                EagleTrustFundTransaction.update_batch_num == batch_num
+            )
+            mailing_list_candidates = session.query(EagleTrustFundDonor).options(
+                load_only(
+                    EagleTrustFundDonor.base_donor_id,
+                    EagleTrustFundDonor.formatted_full_name,
+                    EagleTrustFundDonor.first_name,
+                    EagleTrustFundDonor.last_name,
+                    EagleTrustFundDonor.city,
+                    EagleTrustFundDonor.state,
+                    EagleTrustFundDonor.latest_date
                 )
+            ).filter(
+                EagleTrustFundDonor.mailing_list_status == False,
+                in_batch
             ).order_by(EagleTrustFundDonor.last_name, EagleTrustFundDonor.first_name).all()
         
         return render_template("batch_success.html",
@@ -1443,148 +2408,140 @@ def transaction_search():
         search_performed=False
     )
 
-def format_currency(amount):
-    """Helper function to format currency values"""
-    if amount is None:
-        return "$0.00"
-    return f"${amount:,.2f}"
+def sql_currency(amount):
+    """SQL version of format_currency(): '$1,234.50', or '$0.00' for NULL"""
+    return func.concat('$', func.to_char(func.coalesce(amount, 0), 'FM999,999,999,990.00'))
+
+def sql_csv_text(value):
+    """SQL version of the CSV cell cleanup: '' for NULL, line breaks replaced with spaces"""
+    return func.translate(func.coalesce(cast(value, Text), ''), '\r\n', '  ')
+
+def donor_csv_expression(col_id):
+    """SQL expression for one donor CSV column: currency formatted, '' for NULL (and 0 in integer columns)"""
+    column = getattr(EagleTrustFundDonor, col_id)
+    if col_id in DONOR_CURRENCY_COLUMNS:
+        return sql_currency(column)
+    if isinstance(column.type, Integer):
+        # The Python exporters write '' for 0 as well as for NULL
+        return sql_csv_text(func.nullif(column, 0))
+    return sql_csv_text(column)
+
+def copy_csv_header(headers):
+    """CSV header line for a COPY export, ending in '\n' like the rows COPY writes"""
+    output = io.StringIO()
+    csv.writer(output, quoting=csv.QUOTE_MINIMAL, lineterminator='\n').writerow(headers)
+    return output.getvalue()
 
-def generate_csv_chunked(query, visible_columns, headers, filename, session):
-    """Generate CSV file using chunked processing to avoid memory issues"""
-    from flask import Response
-    
-    def generate_csv_data():
-        """Generator function that yields CSV data in chunks"""
-        # Import CSV writer here to avoid issues with generator scope
-        import csv
-        import io
-        
-        # Write headers first
-        output = io.StringIO()
-        writer = csv.writer(output, quoting=csv.QUOTE_MINIMAL)
-        writer.writerow(headers)
-        output.seek(0)
-        data = output.getvalue()
-        output.close()
-        yield data
-        
-        # Process donors in chunks to avoid loading all into memory
-        offset = 0
-        while True:
-            # Get a chunk of donors
-            donors_chunk = query.offset(offset).limit(DOWNLOAD_CHUNK_SIZE).all()
-            
-            if not donors_chunk:
-                break  # No more data
-            
-            # Process this chunk
-            output = io.StringIO()
-            writer = csv.writer(output, quoting=csv.QUOTE_MINIMAL)
-            
-            for donor in donors_chunk:
-                row = []
-                for col_id, _ in visible_columns:
-                    value = getattr(donor, col_id, None)
-                    if col_id in ['total_dollar_amount', 'latest_amount', 'largest_amount', 'inception_amount']:
-                        value = format_currency(value)
-                    elif value is None:
-                        value = ''
-                    
-                    # Clean up any problematic characters
-                    if value:
-                        cell_str = str(value).replace('\n', ' ').replace('\r', ' ')
-                        row.append(cell_str)
-                    else:
-                        row.append('')
-                
-                writer.writerow(row)
-            
-            # Yield this chunk's data
-            output.seek(0)
-            data = output.getvalue()
-            output.close()
+def copy_query_csv(query, output):
+    """Run COPY (query) TO STDOUT WITH CSV on its own connection, writing the CSV blocks to `output`"""
+    compiled = query.statement.compile(dialect=engine.dialect, compile_kwargs={"render_postcompile": True})
+    connection = engine.raw_connection()
+    try:
+        with connection.cursor() as cursor:
+            # COPY takes no bind parameters, so psycopg2 renders them into the SELECT
+            select_sql = cursor.mogrify(str(compiled), compiled.params).decode()
+            cursor.copy_expert(f"COPY ({select_sql}) TO STDOUT WITH (FORMAT csv)", output)
+        connection.rollback()
+    finally:
+        connection.close()
+
+def gzip_chunks(chunks):
+    """Gzip a stream of text chunks one chunk at a time (never holds more than the compressor's window)"""
+    compressor = zlib.compressobj(CSV_GZIP_LEVEL, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+    for chunk in chunks:
+        data = compressor.compress(chunk.encode('utf-8') if isinstance(chunk, str) else chunk)
+        if data:
             yield data
-            
-            offset += DOWNLOAD_CHUNK_SIZE
-            
-            # Optional: Small delay to prevent overwhelming the database
-            # time.sleep(0.01)  # Uncomment if needed
-    
-    # Return streaming response
-    return Response(
-        generate_csv_data(),
-        mimetype='text/csv',
-        headers={
-            'Content-Disposition': f'attachment; filename={filename}',
-            'Content-Type': 'text/csv; charset=utf-8'
-        }
-    )
+    yield compressor.flush()
 
-def generate_csv_from_donor_ids(donor_ids, visible_columns, headers, filename, db_session):
-    """Generate CSV file using specific donor IDs with chunked processing"""
+def csv_download_response(chunks, filename):
+    """Streaming CSV download, gzipped when the form asks for a .csv.gz file or the client accepts gzip
+
+    An explicit compression=gzip form value downloads a .csv.gz file; otherwise the CSV is sent with
+    Content-Encoding: gzip to clients that accept it, and the browser saves it as a plain .csv.
+    """
     from flask import Response
-    
+
+    headers = {'Vary': 'Accept-Encoding'}
+    if request.values.get('compression') == 'gzip':
+        return Response(
+            gzip_chunks(chunks),
+            mimetype='application/gzip',
+            headers={**headers, 'Content-Disposition': f'attachment; filename={filename}.gz'}
+        )
+
+    headers['Content-Disposition'] = f'attachment; filename={filename}'
+    if 'gzip' in request.accept_encodings:
+        headers['Content-Encoding'] = 'gzip'
+        chunks = gzip_chunks(chunks)
+    return Response(chunks, mimetype='text/csv', content_type='text/csv; charset=utf-8', headers=headers)
+
+def stream_copy_csv(query, headers, filename, cache_key=None):
+    """Stream COPY (query) TO STDOUT WITH CSV from PostgreSQL straight into a download response
+
+    The query should select already formatted text columns. copy_expert blocks until the whole
+    file is written, so it runs in a worker thread that hands each block of CSV to the response
+    generator through a small queue; if the client goes away the COPY is aborted. With a
+    cache_key the file is also written to the export cache as it streams.
+    """
+    chunks = queue.Queue(maxsize=COPY_QUEUE_CHUNKS)
+    cancelled = threading.Event()
+
+    def hand_over(item):
+        """Queue an item for the response; returns False once the download has been abandoned"""
+        while not cancelled.is_set():
+            try:
+                chunks.put(item, timeout=1)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    class QueueWriter:
+        """File-like target for copy_expert"""
+        def write(self, data):
+            if not hand_over(data):
+                raise IOError("CSV download cancelled by the client")
+
+    def run_copy():
+        try:
+            copy_query_csv(query, QueueWriter())
+        except Exception as e:
+            if not cancelled.is_set():
+                app.logger.error(f"COPY export for {filename} failed: {e}")
+                hand_over(e)
+        finally:
+            hand_over(None)
+
     def generate_csv_data():
-        """Generator function that yields CSV data in chunks"""
-        import csv
-        import io
-        
-        # Write headers first
-        output = io.StringIO()
-        writer = csv.writer(output, quoting=csv.QUOTE_MINIMAL)
-        writer.writerow(headers)
-        output.seek(0)
-        data = output.getvalue()
-        output.close()
-        yield data
-        
-        # Process donor IDs in chunks to avoid loading all into memory
-        total_donors = len(donor_ids)
-        for i in range(0, total_donors, DOWNLOAD_CHUNK_SIZE):
-            chunk_ids = donor_ids[i:i + DOWNLOAD_CHUNK_SIZE]
-            
-            # Fetch donors for this chunk
-            donors_chunk = db_session.query(EagleTrustFundDonor).filter(
-                EagleTrustFundDonor.base_donor_id.in_(chunk_ids)
-            ).order_by(EagleTrustFundDonor.last_name, EagleTrustFundDonor.first_name).all()
-            
-            # Process this chunk
-            output = io.StringIO()
-            writer = csv.writer(output, quoting=csv.QUOTE_MINIMAL)
-            
-            for donor in donors_chunk:
-                row = []
-                for col_id, _ in visible_columns:
-                    value = getattr(donor, col_id, None)
-                    if col_id in ['total_dollar_amount', 'latest_amount', 'largest_amount', 'inception_amount']:
-                        value = format_currency(value)
-                    elif value is None:
-                        value = ''
-                    
-                    # Clean up any problematic characters
-                    if value:
-                        cell_str = str(value).replace('\n', ' ').replace('\r', ' ')
-                        row.append(cell_str)
-                    else:
-                        row.append('')
-                
-                writer.writerow(row)
-            
-            # Yield this chunk's data
-            output.seek(0)
-            data = output.getvalue()
-            output.close()
-            yield data
-    
-    # Return streaming response
-    return Response(
-        generate_csv_data(),
-        mimetype='text/csv',
-        headers={
-            'Content-Disposition': f'attachment; filename={filename}',
-            'Content-Type': 'text/csv; charset=utf-8'
-        }
-    )
+        """Generator function that yields the header row, then the CSV blocks from COPY"""
+        yield copy_csv_header(headers)
+
+        threading.Thread(target=run_copy, daemon=True).start()
+        try:
+            while True:
+                item = chunks.get()
+                if item is None:
+                    break
+                if isinstance(item, Exception):
+                    raise item
+                yield item
+        finally:
+            cancelled.set()
+
+    chunks = generate_csv_data()
+    if cache_key:
+        chunks = export_cache.tee(cache_key, chunks)
+    return csv_download_response(chunks, filename)
+
+def donors_in_result_order(db_session, donor_ids):
+    """Query the given donors in the order of `donor_ids`, binding the whole ID list once as an array"""
+    result_ids = func.unnest(bindparam('donor_ids', list(donor_ids), type_=ARRAY(Integer))).table_valued(
+        'base_donor_id', with_ordinality='position'
+    ).render_derived(name='result_ids')
+    return db_session.query(EagleTrustFundDonor).join(
+        result_ids, EagleTrustFundDonor.base_donor_id == result_ids.c.base_donor_id
+    ).order_by(result_ids.c.position)
 
 def generate_csv(data, headers, filename):
     """Generate CSV file from data"""
@@ -1606,20 +2563,52 @@ def generate_csv(data, headers, filename):
                 cleaned_row.append(cell_str)
         writer.writerow(cleaned_row)
     
-    output.seek(0)
+    return csv_download_response([output.getvalue()], filename)
+
+def generate_pdf(data, headers, filename, title, payment_type_totals=None, batch_metadata=None, cache_key=None):
+    """Generate PDF file from data with dynamic sizing based on column count"""
+    if cache_key:
+        # Write straight into the export cache and send the cached file
+        part_path = export_cache.part_path(cache_key)
+        try:
+            # A cached PDF may be sent again up to EXPORT_CACHE_TTL later, so it is stamped "Data as of"
+            write_pdf(part_path, data, headers, title, payment_type_totals, batch_metadata, cached=True)
+            # Opened before store() so the response keeps the file even if it is evicted right away
+            pdf_file = open(part_path, 'rb')
+            try:
+                export_cache.store(cache_key, part_path)
+            except BaseException:
+                pdf_file.close()
+                raise
+            return send_cached_export(pdf_file, 'pdf', filename)
+        finally:
+            if os.path.exists(part_path):
+                os.remove(part_path)
+    
+    buffer = io.BytesIO()
+    write_pdf(buffer, data, headers, title, payment_type_totals, batch_metadata)
+    buffer.seek(0)
     return send_file(
-        io.BytesIO(output.getvalue().encode('utf-8')),
-        mimetype='text/csv',
+        buffer,
+        mimetype='application/pdf',
         as_attachment=True,
         download_name=filename
     )
 
-def generate_pdf(data, headers, filename, title, payment_type_totals=None, batch_metadata=None):
-    """Generate PDF file from data with dynamic sizing based on column count"""
+def send_cached_export(cached_file, format, filename):
+    """Download response for an open file from the export cache; the response closes it"""
+    if format == 'csv':
+        return csv_download_response(export_cache.read_chunks(cached_file), filename)
+    return send_file(cached_file, mimetype='application/pdf', as_attachment=True, download_name=filename)
+
+def write_pdf(output, data, headers, title, payment_type_totals=None, batch_metadata=None, cached=False):
+    """Write the PDF table for generate_pdf to `output` (a file path or binary file object)
+
+    `data` may be any iterable of rows; it is consumed one page at a time. `cached` PDFs
+    are stamped "Data as of" rather than "Generated on", since they are re-sent later.
+    """
     from reportlab.lib.pagesizes import letter, A4, A3, A2, A1, landscape, portrait
     
-    buffer = io.BytesIO()
-    
     # Determine if this is a batch search (4 columns: Donor ID, Donor Name, Type, Amount)
     is_batch_pdf = batch_metadata is not None and len(headers) == 4
     
@@ -1665,7 +2654,7 @@ def generate_pdf(data, headers, filename, title, payment_type_totals=None, batch
             margin = 15
     
     doc = SimpleDocTemplate(
-        buffer,
+        output,
         pagesize=pagesize,
         rightMargin=margin,
         leftMargin=margin,
@@ -1695,7 +2684,8 @@ def generate_pdf(data, headers, filename, title, payment_type_totals=None, batch
         elements.append(Paragraph(f"<strong>Payment Method:</strong> {batch_metadata['payment_method']}", normal_style))
         elements.append(Paragraph("<br/>", normal_style))  # Add some space
     
-    elements.append(Paragraph(f"Generated on {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}", normal_style))
+    stamp = "Data as of" if cached else "Generated on"
+    elements.append(Paragraph(f"{stamp} {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}", normal_style))
     
     # Add payment type totals if provided
     if payment_type_totals:
@@ -1749,6 +2739,7 @@ def generate_pdf(data, headers, filename, title, payment_type_totals=None, batch
     # Process data to add donor totals for batch format PDFs
     processed_data = data
     if is_batch_pdf:
+        data = list(data)
         # Calculate donor totals for multiple payments
         donor_totals = {}
         donor_payment_counts = {}
@@ -1794,9 +2785,6 @@ def generate_pdf(data, headers, filename, title, payment_type_totals=None, batch
             
             processed_data.append([donor_id, donor_name_with_total, payment_type, amount])
     
-    # Create table with dynamic column widths
-    table_data = [headers] + processed_data
-    
     # Calculate available width
     page_width = pagesize[0] - (2 * margin)
     
@@ -1822,8 +2810,7 @@ def generate_pdf(data, headers, filename, title, payment_type_totals=None, batch
             # Use minimum widths - will cause horizontal scrolling but prevent cutoff
             col_widths = [min_col_width] * num_columns
     
-    table = Table(table_data, colWidths=col_widths, repeatRows=1)
-    table.setStyle(TableStyle([
+    table_style = TableStyle([
         ('BACKGROUND', (0, 0), (-1, 0), colors.grey),
         ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
         ('ALIGN', (0, 0), (-1, -1), 'LEFT'),
@@ -1843,19 +2830,121 @@ def generate_pdf(data, headers, filename, title, payment_type_totals=None, batch
         ('GRID', (0, 0), (-1, -1), 0.5, colors.black),
         ('ROWBACKGROUNDS', (0, 1), (-1, -1), [colors.white, colors.lightgrey]),
         ('WORDWRAP', (0, 0), (-1, -1), True),
-    ]))
+    ])
     
-    elements.append(table)
+    def make_table(rows):
+        return Table([headers] + rows, colWidths=col_widths, repeatRows=1, style=table_style)
     
-    # Build PDF
+    # Build PDF; the data table is laid out one page at a time as the rows are read
+    elements.append(PagedTable(processed_data, make_table))
     doc.build(elements)
-    buffer.seek(0)
-    return send_file(
-        buffer,
-        mimetype='application/pdf',
-        as_attachment=True,
-        download_name=filename
-    )
+
+class PagedTable(Flowable):
+    """Table flowable fed from an iterable of rows that becomes one Table per page
+
+    On each page it builds a Table from the header and as many of the next rows as fit, and splits
+    off the rest for the following page. Rows are read ahead only as far as the page needs
+    (PDF_TABLE_CHUNK_ROWS at a time), and the header appears once at the top of each page.
+    """
+
+    def __init__(self, rows, make_table, buffer=(), exhausted=False, page_rows=None):
+        super().__init__()
+        self.hAlign = 'CENTER'
+        self.rows = iter(rows)
+        self.make_table = make_table
+        self.buffer = list(buffer)
+        self.exhausted = exhausted
+        self.page_rows = page_rows  # rows that fit on the previous page, the first guess for this one
+        self.layout = None
+
+    def _read_ahead(self, count):
+        while len(self.buffer) < count and not self.exhausted:
+            more = list(islice(self.rows, PDF_TABLE_CHUNK_ROWS))
+            self.buffer.extend(more)
+            self.exhausted = len(more) < PDF_TABLE_CHUNK_ROWS
+
+    def _fit(self, availWidth, availHeight):
+        """(rows that fit, their Table or None, width, height needed) for the space available
+
+        Narrows down the row count between one that fits and one that doesn't, guessing from the
+        previous page and scaling by height; on a page like the last one it takes two wraps.
+        """
+        fitting = None      # (count, table, width, height) of the largest count known to fit
+        too_tall = None     # (count, height) of the smallest count known not to fit
+        count = self.page_rows + 1 if self.page_rows else PDF_TABLE_CHUNK_ROWS
+        while True:
+            self._read_ahead(count)
+            count = min(count, len(self.buffer))
+            table = self.make_table(self.buffer[:count])
+            width, height = table.wrap(availWidth, availHeight)
+            if height <= availHeight:
+                fitting = (count, table, width, height)
+                if count == len(self.buffer):
+                    break
+            else:
+                too_tall = (count, height)
+            low = fitting[0] if fitting else 0
+            if too_tall and too_tall[0] <= low + 1:
+                break
+            guess = int(count * availHeight / height)
+            count = max(low + 1, guess if too_tall is None else min(too_tall[0] - 1, guess))
+        if fitting is None:
+            return 0, None, width, too_tall[1]
+        count, table, width, height = fitting
+        # With rows left over, report the height they would need so the document splits this
+        return count, table, width, too_tall[1] if too_tall else height
+
+    def wrap(self, availWidth, availHeight):
+        self.layout = (availWidth, availHeight, *self._fit(availWidth, availHeight))
+        return self.layout[4], self.layout[5]
+
+    def split(self, availWidth, availHeight):
+        if self.layout is None or self.layout[:2] != (availWidth, availHeight):
+            self.wrap(availWidth, availHeight)
+        count, table = self.layout[2:4]
+        if table is None:
+            return []
+        rest = PagedTable(self.rows, self.make_table, self.buffer[count:], self.exhausted, page_rows=count)
+        return [table, rest]
+
+    def draw(self):
+        self.layout[3].drawOn(self.canv, 0, 0)
+
+def selected_donor_columns(selected_columns):
+    """(col_id, header) pairs and headers for the columns picked in the download form"""
+    # If no columns selected, use default set
+    if not selected_columns:
+        selected_columns = ['base_donor_id', 'first_name', 'last_name', 'email_address', 'city', 'state', 'total_dollar_amount']
+    
+    # Build columns list in the order selected, filtering out invalid ones
+    visible_columns = [(col_id, DONOR_RESULT_COLUMNS[col_id]) for col_id in selected_columns if col_id in DONOR_RESULT_COLUMNS]
+    headers = [label for _, label in visible_columns]
+    return visible_columns, headers
+
+def pdf_cell(value):
+    return '' if value is None else str(value)
+
+def donor_row_formatter(visible_columns):
+    """Compile a function donor -> list of PDF cell strings for the selected columns
+
+    Built once per export: the attribute lookups become one attrgetter call and each column's
+    converter (currency or plain text) is chosen up front instead of per cell. This only pays
+    off for wide column selections; with the default seven columns it is no faster than
+    formatting each cell in the loop.
+    """
+    col_ids = [col_id for col_id, _ in visible_columns]
+    if not col_ids:
+        return lambda donor: []
+    converters = [format_currency if col_id in DONOR_CURRENCY_COLUMNS else pdf_cell for col_id in col_ids]
+    getter = attrgetter(*col_ids)
+    if len(col_ids) == 1:
+        # attrgetter with a single name returns the value itself, not a 1-tuple
+        convert = converters[0]
+        return lambda donor: [convert(getter(donor))]
+    
+    def format_row(donor):
+        return [convert(value) for convert, value in zip(converters, getter(donor))]
+    return format_row
 
 @app.route("/download_donor_results/<format>", methods=["POST"])
 def download_donor_results(format):
@@ -1867,17 +2956,23 @@ def download_donor_results(format):
             flash("No valid search results found. Please perform a search first.", "error")
             return redirect(request.referrer or url_for('home'))
         
-        cached_results = session['last_search_results']
+        cached_results = get_cached_search_results()
+        if cached_results is None:
+            flash("Your cached search results have expired. Please run the search again.", "error")
+            return redirect(request.referrer or url_for('home'))
+        
+        # Searches only fetch the pages they show; PDFs need the full ID list, so look it up on first download
+        if format == 'pdf' and cached_results['donor_ids'] is None:
+            query, _ = build_search_query(db_session, cached_results['search_params'])
+            cached_results = materialize_search_results(query, cached_results)
         
         # Get donor IDs and count from cache
         donor_ids = cached_results['donor_ids']
         total_count = cached_results['count']
         
-        # SAFETY CHECK: Validate count against limits
-        max_limit = MAX_PDF_RESULTS if format == 'pdf' else MAX_DOWNLOAD_RESULTS
-        
-        if total_count > max_limit:
-            error_msg = f"Search returned {total_count:,} results, which exceeds the {format.upper()} download limit of {max_limit:,} donors. Please refine your search criteria to reduce the number of results."
+        # SAFETY CHECK: direct PDFs are rendered inside the request, so their size is limited
+        if format == 'pdf' and total_count > MAX_PDF_RESULTS:
+            error_msg = f"Search returned {total_count:,} results, which exceeds the PDF download limit of {MAX_PDF_RESULTS:,} donors. Please refine your search criteria or run the PDF as a background export."
             flash(error_msg, "error")
             return redirect(request.referrer or url_for('home'))
         
@@ -1886,105 +2981,172 @@ def download_donor_results(format):
             return redirect(request.referrer or url_for('home'))
         
         # Get selected columns from form
-        selected_columns = request.form.getlist('selected_columns')
-        
-        # Define all available columns with their display names
-        all_columns = {
-            'base_donor_id': 'Donor ID',
-            'old_donor_id': 'Legacy Donor ID',
-            'alternate_id': 'Alternate ID',
-            'name_prefix': 'Name Prefix',
-            'first_name': 'First Name',
-            'last_name': 'Last Name',
-            'suffix': 'Suffix',
-            'formatted_full_name': 'Full Name',
-            'secondary_title': 'Secondary Title',
-            'secondary_first_name': 'Secondary First Name',
-            'secondary_last_name': 'Secondary Last Name',
-            'secondary_suffix': 'Secondary Suffix',
-            'secondary_full_name': 'Secondary Full Name',
-            'address_1_company': 'Company',
-            'address_2_secondary': 'Address Secondary',
-            'address_3_primary': 'Address Primary',
-            'city': 'City',
-            'state': 'State',
-            'zip_plus4': 'ZIP+4',
-            'phone': 'Phone',
-            'work_phone': 'Work Phone',
-            'cell_phone': 'Cell Phone',
-            'salutation_dear': 'Salutation',
-            'removal_request_note': 'Removal Request',
-            'twitter': 'Twitter',
-            'newsletter_status': 'Newsletter Status',
-            'newsletter_status_desc': 'Newsletter Status Desc',
-            'donor_status': 'Donor Status',
-            'donor_status_desc': 'Donor Status Desc',
-            'date_added_to_database': 'Date Added',
-            'email_address': 'Email',
-            'interest_borders': 'Interests - Borders',
-            'interest_pro_life': 'Interests - Pro Life',
-            'interest_eagle_council': 'Interests - Eagle Council',
-            'interest_topic_1': 'Interest Topic 1',
-            'interest_topic_2': 'Interest Topic 2',
-            'interest_topic_3': 'Interest Topic 3',
-            'interest_topic_4': 'Interest Topic 4',
-            'education_reporter_status': 'Education Reporter Status',
-            'expiration_date': 'Expiration Date',
-            'news_and_notes_status': 'News Notes Status',
-            'rnc_life_status': 'RNC Life Status',
-            'eagle_status': 'Eagle Status',
-            'eagle_state_president': 'Eagle State President',
-            'flag': 'Flag',
-            'changed': 'Changed',
-            'interest': 'Interest',
-            'house_publications': 'House Publications',
-            'latest_date': 'Latest Date',
-            'latest_amount': 'Latest Amount',
-            'largest_date': 'Largest Date',
-            'largest_amount': 'Largest Amount',
-            'inception_date': 'Inception Date',
-            'inception_amount': 'Inception Amount',
-            'total_dollar_amount': 'Total Amount',
-            'total_responses_non_zero': 'Total Responses (Non-Zero)',
-            'total_responses_includes_zero': 'Total Responses'
-        }
-        
-        # If no columns selected, use default set
-        if not selected_columns:
-            selected_columns = ['base_donor_id', 'first_name', 'last_name', 'email_address', 'city', 'state', 'total_dollar_amount']
+        visible_columns, headers = selected_donor_columns(request.form.getlist('selected_columns'))
         
-        # Build columns list in the order selected, filtering out invalid ones
-        visible_columns = [(col_id, all_columns[col_id]) for col_id in selected_columns if col_id in all_columns]
-        headers = [label for _, label in visible_columns]
-        
-        # Generate appropriate file format using cached donor IDs
+        # Identical repeat downloads (same rows, columns and format, unchanged data) come from the export cache
         timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
+        if donor_ids is not None:
+            rows = hashlib.sha256(array('q', donor_ids).tobytes()).hexdigest()
+        else:
+            rows = search_cache_params(cached_results['search_params'])
+        cache_key = export_cache.key('donors', format, rows, [col_id for col_id, _ in visible_columns])
+        cached_file = export_cache.open(cache_key)
+        if cached_file:
+            return send_cached_export(cached_file, format, f'donor_results_{timestamp}.{format}')
+        
         if format == 'csv':
-            return generate_csv_from_donor_ids(donor_ids, visible_columns, headers, f'donor_results_{timestamp}.csv', db_session)
+            # Use the cached IDs if a page jump or PDF already fetched them, otherwise the search itself
+            if donor_ids is not None:
+                query = donors_in_result_order(db_session, donor_ids)
+            else:
+                query, _ = build_search_query(db_session, cached_results['search_params'])
+                query = query.order_by(*donor_sort_columns())
+            query = query.with_entities(*[donor_csv_expression(col_id) for col_id, _ in visible_columns])
+            return stream_copy_csv(query, headers, f'donor_results_{timestamp}.csv', cache_key)
         elif format == 'pdf':
             # For PDF, fetch all donors using the cached IDs
-            donors = db_session.query(EagleTrustFundDonor).filter(
-                EagleTrustFundDonor.base_donor_id.in_(donor_ids)
-            ).order_by(EagleTrustFundDonor.last_name, EagleTrustFundDonor.first_name).all()
-            
-            data = []
-            for donor in donors:
-                row = []
-                for col_id, _ in visible_columns:
-                    value = getattr(donor, col_id, None)
-                    if col_id in ['total_dollar_amount', 'latest_amount', 'largest_amount', 'inception_amount']:
-                        value = format_currency(value)
-                    elif value is None:
-                        value = ''
-                    row.append(str(value))
-                data.append(row)
-            return generate_pdf(data, headers, f'donor_results_{timestamp}.pdf', 'Donor Search Results')
+            donors = donors_in_result_order(db_session, donor_ids).yield_per(DOWNLOAD_CHUNK_SIZE)
+            data = map(donor_row_formatter(visible_columns), donors)
+            return generate_pdf(data, headers, f'donor_results_{timestamp}.pdf', 'Donor Search Results', cache_key=cache_key)
         else:
             abort(400, "Invalid format specified")
             
     finally:
         db_session.close()
 
+class ProgressWriter:
+    """Binary file wrapper that records how many CSV rows (lines) have been written for an export job"""
+
+    def __init__(self, file, job_id):
+        self.file = file
+        self.job_id = job_id
+        self.rows = 0
+        self.reported = 0
+
+    def write(self, data):
+        self.file.write(data)
+        self.rows += data.count(b'\n')
+        if self.rows - self.reported >= DOWNLOAD_CHUNK_SIZE:
+            export_jobs.update(self.job_id, rows_done=self.rows)
+            self.reported = self.rows
+
+def run_export_job(job_id, format, donor_ids, visible_columns, headers, compress=False):
+    """Write a donor export file in the export worker pool, recording progress in the job registry
+
+    With `compress` a CSV is gzipped as it is written (the job's filename then ends in .csv.gz).
+    """
+    job = export_jobs.get(job_id)
+    path = export_jobs.file_path(job)
+    db_session = Session()
+    try:
+        export_jobs.update(job_id, status='running')
+        query = donors_in_result_order(db_session, donor_ids)
+        if format == 'csv':
+            with open(path + '.part', 'wb') as raw_file:
+                f = gzip.GzipFile(fileobj=raw_file, mode='wb', compresslevel=CSV_GZIP_LEVEL) if compress else raw_file
+                with f:
+                    f.write(copy_csv_header(headers).encode('utf-8'))
+                    query = query.with_entities(*[donor_csv_expression(col_id) for col_id, _ in visible_columns])
+                    copy_query_csv(query, ProgressWriter(f, job_id))
+        else:
+            format_row = donor_row_formatter(visible_columns)
+            def pdf_rows():
+                # Rows are produced as write_pdf reaches them, so progress follows the rendering
+                for row_number, donor in enumerate(query.yield_per(DOWNLOAD_CHUNK_SIZE), 1):
+                    yield format_row(donor)
+                    if row_number % DOWNLOAD_CHUNK_SIZE == 0:
+                        export_jobs.update(job_id, rows_done=row_number)
+            write_pdf(path + '.part', pdf_rows(), headers, 'Donor Search Results')
+        os.replace(path + '.part', path)
+        export_jobs.update(job_id, status='done', rows_done=len(donor_ids), finished_at=time.time())
+    except Exception as e:
+        app.logger.error(f"Export job {job_id} failed: {e}")
+        export_jobs.update(job_id, status='failed', error=str(e), finished_at=time.time())
+        if os.path.exists(path + '.part'):
+            os.remove(path + '.part')
+    finally:
+        db_session.close()
+
+@app.route("/start_export/<format>", methods=["POST"])
+def start_export_job(format):
+    """Start a background export of the cached donor search results and show its progress page"""
+    if format not in ('csv', 'pdf'):
+        abort(400, "Invalid format specified")
+    
+    db_session = Session()
+    try:
+        if not is_search_session_valid():
+            flash("No valid search results found. Please perform a search first.", "error")
+            return redirect(request.referrer or url_for('home'))
+        
+        cached_results = get_cached_search_results()
+        if cached_results is None:
+            flash("Your cached search results have expired. Please run the search again.", "error")
+            return redirect(request.referrer or url_for('home'))
+        
+        # The job exports a fixed snapshot of the result set
+        if cached_results['donor_ids'] is None:
+            query, _ = build_search_query(db_session, cached_results['search_params'])
+            cached_results = materialize_search_results(query, cached_results)
+        donor_ids = cached_results['donor_ids']
+        
+        if not donor_ids:
+            flash("No results found for your search criteria.", "warning")
+            return redirect(request.referrer or url_for('home'))
+        
+        visible_columns, headers = selected_donor_columns(request.form.getlist('selected_columns'))
+        
+        # Same "Compress CSV (.csv.gz)" option as the direct download
+        compress = format == 'csv' and request.form.get('compression') == 'gzip'
+        
+        export_jobs.purge_expired(EXPORT_FILE_TTL)
+        timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
+        filename = f'donor_results_{timestamp}.{format}' + ('.gz' if compress else '')
+        job_id = export_jobs.create(format, filename, len(donor_ids), export_job_owner())
+        export_executor.submit(run_export_job, job_id, format, donor_ids, visible_columns, headers, compress)
+        
+        return redirect(url_for('export_job_page', job_id=job_id))
+    finally:
+        db_session.close()
+
+@app.route("/export_jobs/<job_id>")
+def export_job_page(job_id):
+    """Progress page for a background export; polls export_job_status until the file is ready"""
+    job = get_own_export_job(job_id)
+    if job is None:
+        abort(404)
+    return render_template("export_job.html", job=job)
+
+@app.route("/export_jobs/<job_id>/status")
+def export_job_status(job_id):
+    """JSON status of a background export"""
+    job = get_own_export_job(job_id)
+    if job is None:
+        return jsonify({'error': 'Export job not found'}), 404
+    return jsonify({
+        'status': job['status'],
+        'rows_done': job['rows_done'],
+        'rows_total': job['rows_total'],
+        'error': job['error'],
+        'download_url': url_for('download_export_job', job_id=job_id) if job['status'] == 'done' else None
+    })
+
+@app.route("/export_jobs/<job_id>/download")
+def download_export_job(job_id):
+    job = get_own_export_job(job_id)
+    if job is None or job['status'] != 'done' or not os.path.exists(export_jobs.file_path(job)):
+        abort(404)
+    if job['filename'].endswith('.gz'):
+        mimetype = 'application/gzip'
+    else:
+        mimetype = 'text/csv' if job['format'] == 'csv' else 'application/pdf'
+    return send_file(
+        export_jobs.file_path(job),
+        mimetype=mimetype,
+        as_attachment=True,
+        download_name=job['filename']
+    )
+
 @app.route("/download_transaction_results/<format>", methods=["POST"])
 def download_transaction_results(format):
     session = Session()
@@ -2002,6 +3164,12 @@ def download_transaction_results(format):
             'bluebook_list_description': request.form.get('bluebook_list_description', '').strip(),
         }
         
+        timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
+        cache_key = export_cache.key('transactions', format, search_params)
+        cached_file = export_cache.open(cache_key)
+        if cached_file:
+            return send_cached_export(cached_file, format, f'transaction_results_{timestamp}.{format}')
+        
         # Build query
         query = session.query(EagleTrustFundTransaction).join(
             EagleTrustFundDonor,
@@ -2030,11 +3198,7 @@ def download_transaction_results(format):
         if search_params['bluebook_list_description']:
             query = query.filter(EagleTrustFundTransaction.bluebook_list_description.ilike(f"%{search_params['bluebook_list_description']}%"))
         
-        transactions = query.order_by(EagleTrustFundTransaction.trans_date.desc()).all()
-        
-        # Calculate payment type totals if searching by batch or single day
-        payment_type_totals = None
-        batch_metadata = None
+        query = query.order_by(EagleTrustFundTransaction.trans_date.desc())
         
         # Check if this is a batch search (by batch number) or single-day search (same start/end date)
         is_batch_search = bool(search_params.get('update_batch_num'))
@@ -2044,26 +3208,87 @@ def download_transaction_results(format):
         
         is_batch_format = is_batch_search or is_single_day_search
         
+        # CSV rows are formatted in SQL and streamed by COPY (same columns as the Python rows below)
+        if format == 'csv':
+            donor_name = sql_csv_text(func.coalesce(
+                func.nullif(EagleTrustFundDonor.formatted_full_name, ''),
+                func.trim(func.concat(EagleTrustFundDonor.first_name, ' ', EagleTrustFundDonor.last_name))
+            ))
+            if is_batch_format:
+                headers = ['Donor ID', 'Donor Name', 'Type', 'Amount']
+                columns = [
+                    sql_csv_text(EagleTrustFundDonor.base_donor_id),
+                    donor_name,
+                    sql_csv_text(EagleTrustFundTransaction.payment_type),
+                    sql_currency(EagleTrustFundTransaction.trans_amount)
+                ]
+            else:
+                headers = ['Date', 'Donor Name', 'Amount', 'Payment Type', 'Payment Method', 'Batch #', 'Job Description']
+                job_description = case(
+                    (and_(
+                        func.extract('year', EagleTrustFundTransaction.trans_date) > 2018,
+                        EagleTrustFundTransaction.payment_type == 'E',
+                        EagleTrustFundTransaction.bluebook_job_description == 'DUES OR EAGLES'
+                    ), 'PS EAGLES'),
+                    else_=EagleTrustFundTransaction.bluebook_job_description
+                )
+                columns = [
+                    sql_csv_text(EagleTrustFundTransaction.trans_date),
+                    donor_name,
+                    sql_currency(EagleTrustFundTransaction.trans_amount),
+                    sql_csv_text(EagleTrustFundTransaction.payment_type),
+                    sql_csv_text(EagleTrustFundTransaction.payment_method),
+                    sql_csv_text(EagleTrustFundTransaction.update_batch_num),
+                    sql_csv_text(job_description)
+                ]
+            return stream_copy_csv(query.with_entities(*columns), headers, f'transaction_results_{timestamp}.csv', cache_key)
+        
+        # One joined, column-projected query streamed in chunks; donor fields come from the join
+        # instead of a lazy load of trans.donor per row
+        transactions = query.with_entities(
+            EagleTrustFundTransaction.trans_date,
+            EagleTrustFundTransaction.trans_amount,
+            EagleTrustFundTransaction.payment_type,
+            EagleTrustFundTransaction.payment_method,
+            EagleTrustFundTransaction.update_batch_num,
+            EagleTrustFundTransaction.bluebook_job_description,
+            EagleTrustFundDonor.base_donor_id,
+            EagleTrustFundDonor.formatted_full_name,
+            EagleTrustFundDonor.first_name,
+            EagleTrustFundDonor.last_name
+        ).yield_per(DOWNLOAD_CHUNK_SIZE)
+        
+        # Calculate payment type totals if searching by batch or single day
+        payment_type_totals = {} if is_batch_format else None
+        batch_metadata = None
+        
+        # Define columns based on whether it's a batch format (batch search or single-day search)
         if is_batch_format:
-            payment_type_totals = {}
-            
-            # Collect batch metadata from first transaction
-            if transactions:
-                first_trans = transactions[0]
-                if is_batch_search:
-                    batch_metadata = {
-                        'batch_number': search_params.get('update_batch_num'),
-                        'date': first_trans.trans_date.strftime('%Y-%m-%d'),
-                        'payment_method': first_trans.payment_method or 'Not specified'
-                    }
-                else:  # is_single_day_search
-                    batch_metadata = {
-                        'batch_number': None,  # No batch number for single-day searches
-                        'date': search_params.get('start_date'),
-                        'payment_method': 'Various'  # Multiple payment methods possible in a day
-                    }
-            
-            for trans in transactions:
+            # For batch PDFs and single-day PDFs: only Donor ID, Donor Name, Type, Amount
+            headers = ['Donor ID', 'Donor Name', 'Type', 'Amount']
+        else:
+            # For regular searches: full columns
+            headers = ['Date', 'Donor Name', 'Amount', 'Payment Type', 'Payment Method', 'Batch #', 'Job Description']
+        
+        # Prepare transaction data rows (and batch totals) in a single pass
+        transaction_data = []
+        for trans in transactions:
+            if is_batch_format:
+                # Collect batch metadata from first transaction
+                if batch_metadata is None:
+                    if is_batch_search:
+                        batch_metadata = {
+                            'batch_number': search_params.get('update_batch_num'),
+                            'date': trans.trans_date.strftime('%Y-%m-%d'),
+                            'payment_method': trans.payment_method or 'Not specified'
+                        }
+                    else:  # is_single_day_search
+                        batch_metadata = {
+                            'batch_number': None,  # No batch number for single-day searches
+                            'date': search_params.get('start_date'),
+                            'payment_method': 'Various'  # Multiple payment methods possible in a day
+                        }
+                
                 payment_type = trans.payment_type or 'Unknown'
                 
                 # Combine N and M payment types
@@ -2095,23 +3320,11 @@ def download_transaction_results(format):
                         payment_type_totals[payment_type]['description'] = 'PURCH MATERIALS EFELDF'
                     else:
                         payment_type_totals[payment_type]['description'] = trans.bluebook_job_description or 'Unknown'
-        
-        # Define columns based on whether it's a batch format (batch search or single-day search)
-        if is_batch_format:
-            # For batch PDFs and single-day PDFs: only Donor ID, Donor Name, Type, Amount
-            headers = ['Donor ID', 'Donor Name', 'Type', 'Amount']
-        else:
-            # For regular searches: full columns
-            headers = ['Date', 'Donor Name', 'Amount', 'Payment Type', 'Payment Method', 'Batch #', 'Job Description']
-        
-        # Prepare transaction data rows
-        transaction_data = []
-        for trans in transactions:
-            if is_batch_format:
+                
                 # Simplified batch format
                 transaction_data.append([
-                    str(trans.donor.base_donor_id),
-                    trans.donor.formatted_full_name or f"{trans.donor.first_name} {trans.donor.last_name}".strip(),
+                    str(trans.base_donor_id),
+                    trans.formatted_full_name or f"{trans.first_name} {trans.last_name}".strip(),
                     trans.payment_type or '',
                     format_currency(trans.trans_amount)
                 ])
@@ -2125,7 +3338,7 @@ def download_transaction_results(format):
                 
                 transaction_data.append([
                     trans.trans_date.strftime('%Y-%m-%d'),
-                    trans.donor.formatted_full_name or f"{trans.donor.first_name} {trans.donor.last_name}",
+                    trans.formatted_full_name or f"{trans.first_name} {trans.last_name}",
                     format_currency(trans.trans_amount),
                     trans.payment_type or '',
                     trans.payment_method or '',
@@ -2134,16 +3347,13 @@ def download_transaction_results(format):
                 ])
         
         # Generate appropriate file format
-        timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
-        if format == 'csv':
-            return generate_csv(transaction_data, headers, f'transaction_results_{timestamp}.csv')
-        elif format == 'pdf':
+        if format == 'pdf':
             title = 'Transaction Search Results'
             if is_batch_search and search_params.get('update_batch_num'):
                 title = f'Batch {search_params.get("update_batch_num")} - Transaction Results'
             elif is_single_day_search:
                 title = f'Batch for {search_params.get("start_date")} - Transaction Results'
-            return generate_pdf(transaction_data, headers, f'transaction_results_{timestamp}.pdf', title, payment_type_totals, batch_metadata)
+            return generate_pdf(transaction_data, headers, f'transaction_results_{timestamp}.pdf', title, payment_type_totals, batch_metadata, cache_key)
         else:
             abort(400, "Invalid format specified")
             
@@ -2201,35 +3411,21 @@ def refresh_transactions():
                     processed_transactions += 1
                     
                     # Update latest transaction
-                    latest_date_obj = None
-                    if donor.latest_date:
-                        try:
-                            latest_date_obj = datetime.strptime(donor.latest_date, '%Y-%m-%d').date()
-                        except ValueError:
-                            pass
-                    
-                    if latest_date_obj is None or trans_date > latest_date_obj:
-                        donor.latest_date = trans_date.strftime('%Y-%m-%d')
+                    if donor.latest_date is None or trans_date > donor.latest_date:
+                        donor.latest_date = trans_date
                         donor.latest_amount = trans_amount
                         donor_updated = True
                         
                     # Update largest transaction
                     if donor.largest_amount is None or trans_amount > donor.largest_amount:
                         donor.largest_amount = trans_amount
-                        donor.largest_date = trans_date.strftime('%Y-%m-%d')
+                        donor.largest_date = trans_date
                         donor_updated = True
                     
                     # Update first/inception transaction
-                    inception_date_obj = None
-                    if donor.inception_date:
-                        try:
-                            inception_date_obj = datetime.strptime(donor.inception_date, '%Y-%m-%d').date()
-                        except ValueError:
-                            pass
-                    
-                    if inception_date_obj is None or trans_date < inception_date_obj:
+                    if donor.inception_date is None or trans_date < donor.inception_date:
                         donor.inception_amount = trans_amount
-                        donor.inception_date = trans_date.strftime('%Y-%m-%d')
+                        donor.inception_date = trans_date
                         donor_updated = True
                     
                     # Update total amounts and response counts
@@ -2293,50 +3489,61 @@ def get_donor_info(donor_id):
     finally:
         session.close()
 
+# Recent check_existing_batch summaries, tagged with the data version they were computed at.
+# Any committed transaction change bumps the version (see invalidate_export_cache), and
+# commit_batch_submission also drops its batch here right away.
+batch_summary_cache = OrderedDict()
+batch_summary_lock = threading.Lock()
+
+def forget_batch_summary(batch_num):
+    with batch_summary_lock:
+        batch_summary_cache.pop(batch_num, None)
+
 @app.route("/check_existing_batch/<batch_num>")
 def check_existing_batch(batch_num):
     """AJAX endpoint to check if a batch already exists and return its summary"""
+    data_version = export_cache.data_version()
+    with batch_summary_lock:
+        cached = batch_summary_cache.get(batch_num)
+        if cached is not None and cached[0] == data_version and time.time() - cached[1] < BATCH_SUMMARY_CACHE_TTL:
+            batch_summary_cache.move_to_end(batch_num)
+            return jsonify(cached[2])
+    
     session = Session()
     try:
-        # Get all transactions for this batch
-        existing_transactions = session.query(EagleTrustFundTransaction).filter_by(
-            update_batch_num=batch_num
-        ).all()
-        
-        if not existing_transactions:
-            return jsonify({'exists': False})
-        
-        # Calculate totals
-        total_count = len(existing_transactions)
-        total_amount = sum(t.trans_amount for t in existing_transactions)
-        
-        # Calculate payment type breakdown
-        payment_types = {}
-        for trans in existing_transactions:
-            payment_type = trans.payment_type or 'Unknown'
-            
-            if payment_type not in payment_types:
-                payment_types[payment_type] = {
-                    'count': 0,
-                    'amount': 0,
-                    'description': trans.bluebook_job_description or 'Unknown'
-                }
-            
-            payment_types[payment_type]['count'] += 1
-            payment_types[payment_type]['amount'] += float(trans.trans_amount)
+        # One aggregate over ix_transactions_update_batch_num; amounts are summed exactly as numeric
+        payment_type = func.coalesce(EagleTrustFundTransaction.payment_type, 'Unknown')
+        rows = session.query(
+            payment_type,
+            func.count(),
+            func.sum(EagleTrustFundTransaction.trans_amount),
+            func.min(EagleTrustFundTransaction.bluebook_job_description)
+        ).filter(EagleTrustFundTransaction.update_batch_num == batch_num).group_by(payment_type).all()
         
-        return jsonify({
-            'exists': True,
-            'totalCount': total_count,
-            'totalAmount': float(total_amount),
-            'paymentTypes': payment_types
-        })
-    
+        if not rows:
+            summary = {'exists': False}
+        else:
+            summary = {
+                'exists': True,
+                'totalCount': sum(count for _, count, _, _ in rows),
+                'totalAmount': float(sum(amount for _, _, amount, _ in rows)),
+                'paymentTypes': {
+                    type_code: {'count': count, 'amount': float(amount), 'description': description or 'Unknown'}
+                    for type_code, count, amount, description in rows
+                }
+            }
     except Exception as e:
         app.logger.error(f"Error checking existing batch {batch_num}: {e}")
         return jsonify({'exists': False, 'error': str(e)})
     finally:
         session.close()
+    
+    with batch_summary_lock:
+        batch_summary_cache[batch_num] = (data_version, time.time(), summary)
+        batch_summary_cache.move_to_end(batch_num)
+        while len(batch_summary_cache) > BATCH_SUMMARY_CACHE_ENTRIES:
+            batch_summary_cache.popitem(last=False)
+    return jsonify(summary)
 
 @app.route("/mailing_list_generator", methods=["GET", "POST"])
 def mailing_list_candidates():
@@ -2451,13 +3658,11 @@ def mailing_list_candidates():
                 recent_donors_to_exclude = set()
                 if exclusion_start_date and exclusion_end_date:
                     try:
-                        # Method 1: compare donor.latest_date strings
+                        # Method 1: donor.latest_date in the exclusion window
                         exclude_query1 = session.query(EagleTrustFundDonor.base_donor_id).filter(
                             and_(
-                                EagleTrustFundDonor.latest_date.isnot(None),
-                                EagleTrustFundDonor.latest_date != '',
-                                EagleTrustFundDonor.latest_date >= exclusion_start_date.strftime('%Y-%m-%d'),
-                                EagleTrustFundDonor.latest_date <= exclusion_end_date.strftime('%Y-%m-%d')
+                                EagleTrustFundDonor.latest_date >= exclusion_start_date,
+                                EagleTrustFundDonor.latest_date <= exclusion_end_date
                             )
                         ).all()
                         recent_donors_to_exclude.update({row[0] for row in exclude_query1})
@@ -2820,32 +4025,18 @@ def edit_transaction(transaction_id):
                         donor.total_responses_non_zero += 1
                     
                     # Update latest transaction
-                    latest_date_obj = None
-                    if donor.latest_date:
-                        try:
-                            latest_date_obj = datetime.strptime(donor.latest_date, '%Y-%m-%d').date()
-                        except ValueError:
-                            pass
-                    
-                    if latest_date_obj is None or tx.trans_date > latest_date_obj:
-                        donor.latest_date = tx.trans_date.strftime('%Y-%m-%d')
+                    if donor.latest_date is None or tx.trans_date > donor.latest_date:
+                        donor.latest_date = tx.trans_date
                         donor.latest_amount = tx.trans_amount
                     
                     # Update largest transaction
                     if donor.largest_amount is None or tx.trans_amount > donor.largest_amount:
                         donor.largest_amount = tx.trans_amount
-                        donor.largest_date = tx.trans_date.strftime('%Y-%m-%d')
+                        donor.largest_date = tx.trans_date
                     
                     # Update inception transaction
-                    inception_date_obj = None
-                    if donor.inception_date:
-                        try:
-                            inception_date_obj = datetime.strptime(donor.inception_date, '%Y-%m-%d').date()
-                        except ValueError:
-                            pass
-                    
-                    if inception_date_obj is None or tx.trans_date < inception_date_obj:
-                        donor.inception_date = tx.trans_date.strftime('%Y-%m-%d')
+                    if donor.inception_date is None or tx.trans_date < donor.inception_date:
+                        donor.inception_date = tx.trans_date
                         donor.inception_amount = tx.trans_amount
 
             session.commit()
@@ -2880,16 +4071,14 @@ def quick_edit_expiration(donor_id):
         new_expiration = request.json.get('expiration_date')
         if new_expiration:
             try:
-                # Validate date format
-                datetime.strptime(new_expiration, '%Y-%m-%d')
-                donor.expiration_date = new_expiration
+                donor.expiration_date = datetime.strptime(new_expiration, '%Y-%m-%d').date()
             except ValueError:
                 return jsonify({'success': False, 'error': 'Invalid date format'})
         else:
             donor.expiration_date = None
         
         session.commit()
-        return jsonify({'success': True, 'new_date': donor.expiration_date})
+        return jsonify({'success': True, 'new_date': donor.expiration_date.isoformat() if donor.expiration_date else None})
         
     except Exception as e:
         session.rollback()
@@ -3026,9 +4215,9 @@ def search_donor_by_name():
         # Search by first name, last name, or formatted full name
         donors = session.query(EagleTrustFundDonor).filter(
             or_(
-                EagleTrustFundDonor.first_name.ilike(f"%{query}%"),
-                EagleTrustFundDonor.last_name.ilike(f"%{query}%"),
-                EagleTrustFundDonor.formatted_full_name.ilike(f"%{query}%")
+                text_search_condition(EagleTrustFundDonor.first_name, query),
+                text_search_condition(EagleTrustFundDonor.last_name, query),
+                text_search_condition(EagleTrustFundDonor.formatted_full_name, query)
             )
         ).limit(10).all()
         
@@ -3049,233 +4238,8 @@ def search_donor_by_name():
 
 def generate_donor_profile_pdf(donor, gifted_to=None, gifted_by=None):
     """Generate PDF profile for a single donor"""
-    from reportlab.lib.pagesizes import letter, portrait
-    from reportlab.platypus import Paragraph, Spacer
-    from reportlab.lib.units import inch
-    
     buffer = io.BytesIO()
-    
-    # Use portrait letter size for donor profiles
-    pagesize = portrait(letter)
-    margin = 72  # 1 inch margins
-    
-    doc = SimpleDocTemplate(
-        buffer,
-        pagesize=pagesize,
-        rightMargin=margin,
-        leftMargin=margin,
-        topMargin=margin,
-        bottomMargin=margin
-    )
-    
-    elements = []
-    styles = getSampleStyleSheet()
-    
-    # Title
-    title_style = styles['Heading1'].clone('DonorTitle')
-    title_style.fontSize = 18
-    title_style.spaceAfter = 20
-    
-    normal_style = styles['Normal'].clone('DonorNormal')
-    normal_style.fontSize = 10
-    normal_style.spaceAfter = 6
-    
-    heading_style = styles['Heading2'].clone('DonorHeading')
-    heading_style.fontSize = 14
-    heading_style.spaceAfter = 10
-    heading_style.spaceBefore = 15
-    
-    # Build donor name for title
-    donor_name = donor.formatted_full_name
-    if not donor_name:
-        name_parts = []
-        if donor.name_prefix:
-            name_parts.append(donor.name_prefix)
-        if donor.first_name:
-            name_parts.append(donor.first_name)
-        if donor.last_name:
-            name_parts.append(donor.last_name)
-        if donor.suffix:
-            name_parts.append(donor.suffix)
-        donor_name = ' '.join(name_parts) if name_parts else f"Donor #{donor.base_donor_id}"
-    
-    elements.append(Paragraph(f"Donor Profile: {donor_name}", title_style))
-    elements.append(Paragraph(f"Generated on {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}", normal_style))
-    elements.append(Spacer(1, 12))
-    
-    # Basic Information Section
-    elements.append(Paragraph("Basic Information", heading_style))
-    
-    basic_info = [
-        ("Donor ID", str(donor.base_donor_id)),
-        ("Legacy Donor ID", str(donor.old_donor_id) if donor.old_donor_id else None),
-        ("Alternate ID", donor.alternate_id),
-        ("Name", donor_name),
-        ("Date Added", donor.date_added_to_database),
-    ]
-    
-    # Secondary name if exists
-    secondary_parts = []
-    if donor.secondary_title and donor.secondary_title.lower() != 'nan':
-        secondary_parts.append(donor.secondary_title)
-    if donor.secondary_first_name and donor.secondary_first_name.lower() != 'nan':
-        secondary_parts.append(donor.secondary_first_name)
-    if donor.secondary_last_name and donor.secondary_last_name.lower() != 'nan':
-        secondary_parts.append(donor.secondary_last_name)
-    if donor.secondary_suffix and donor.secondary_suffix.lower() != 'nan':
-        secondary_parts.append(donor.secondary_suffix)
-    
-    if secondary_parts:
-        basic_info.append(("Secondary Name", ' '.join(secondary_parts)))
-    
-    if donor.salutation_dear:
-        basic_info.append(("Salutation", donor.salutation_dear))
-    
-    for label, value in basic_info:
-        if value:
-            elements.append(Paragraph(f"<b>{label}:</b> {value}", normal_style))
-    
-    # Contact & Address Section
-    elements.append(Paragraph("Contact & Address", heading_style))
-    
-    # Build address
-    address_parts = []
-    if donor.address_1_company:
-        address_parts.append(donor.address_1_company)
-    if donor.address_2_secondary:
-        address_parts.append(donor.address_2_secondary)
-    if donor.address_3_primary:
-        address_parts.append(donor.address_3_primary)
-    
-    city_state_zip = []
-    if donor.city:
-        city_state_zip.append(donor.city)
-    if donor.state:
-        city_state_zip.append(donor.state)
-    if donor.zip_plus4:
-        city_state_zip.append(donor.zip_plus4)
-    
-    if city_state_zip:
-        if donor.city and donor.state:
-            address_parts.append(f"{donor.city}, {donor.state} {donor.zip_plus4 or ''}".strip())
-        else:
-            address_parts.append(' '.join(city_state_zip))
-    
-    if address_parts:
-        elements.append(Paragraph(f"<b>Address:</b><br/>{' '.join(['&nbsp;'] * 4)}{('<br/>' + ' '.join(['&nbsp;'] * 4)).join(address_parts)}", normal_style))
-    
-    contact_info = [
-        ("Country", donor.country),
-        ("Email", donor.email_address),
-        ("Phone", donor.phone),
-        ("Work Phone", donor.work_phone),
-        ("Cell Phone", donor.cell_phone),
-        ("Twitter", donor.twitter),
-        ("House Publications", donor.house_publications),
-    ]
-    
-    for label, value in contact_info:
-        if value:
-            elements.append(Paragraph(f"<b>{label}:</b> {value}", normal_style))
-    
-    # Status Information Section
-    elements.append(Paragraph("Status Information", heading_style))
-    
-    status_info = [
-        ("Donor Status", donor.donor_status_desc or donor.donor_status or "Not specified"),
-        ("Newsletter Status", donor.newsletter_status_desc or donor.newsletter_status or "Not specified"),
-        ("Expiration Date", donor.expiration_date or "Not set"),
-        ("Mailing List Status", "✓ Active" if donor.mailing_list_status else "✗ Inactive"),
-        ("Mailing Until Date", donor.mailing_until_date or "Not set"),
-    ]
-    
-    for label, value in status_info:
-        elements.append(Paragraph(f"<b>{label}:</b> {value}", normal_style))
-    
-    # Gift Subscriptions Section
-    elements.append(Paragraph("Gift Subscriptions", heading_style))
-    
-    if gifted_by:
-        gifted_by_name = gifted_by.formatted_full_name or f"{gifted_by.first_name or ''} {gifted_by.last_name or ''}".strip()
-        elements.append(Paragraph(f"<b>Subscription Gifted By:</b> #{gifted_by.base_donor_id} - {gifted_by_name}", normal_style))
-    
-    if gifted_to:
-        gifted_to_name = gifted_to.formatted_full_name or f"{gifted_to.first_name or ''} {gifted_to.last_name or ''}".strip()
-        elements.append(Paragraph(f"<b>Has Gifted To:</b> #{gifted_to.base_donor_id} - {gifted_to_name}", normal_style))
-    
-    if not gifted_by and not gifted_to:
-        elements.append(Paragraph("No active gift subscriptions", normal_style))
-    
-    # Donation Summary Section
-    elements.append(Paragraph("Donation Summary", heading_style))
-    
-    donation_summary = [
-        ("Total Donated", format_currency(donor.total_dollar_amount)),
-        ("Total Responses", f"{donor.total_responses_includes_zero or 0} ({donor.total_responses_non_zero or 0} non-zero)"),
-        ("Latest Donation", f"{format_currency(donor.latest_amount)} on {donor.latest_date}" if donor.latest_amount else "None recorded"),
-        ("Largest Donation", f"{format_currency(donor.largest_amount)} on {donor.largest_date}" if donor.largest_amount else "None recorded"),
-        ("First Donation", f"{format_currency(donor.inception_amount)} on {donor.inception_date}" if donor.inception_amount else "None recorded"),
-    ]
-    
-    for label, value in donation_summary:
-        elements.append(Paragraph(f"<b>{label}:</b> {value}", normal_style))
-    
-    # Transaction History Section
-    if donor.transactions:
-        elements.append(Paragraph(f"Transaction History ({len(donor.transactions)} transactions)", heading_style))
-        
-        # Create transaction table
-        transaction_headers = ['Date', 'Amount', 'Payment Type', 'Payment Method', 'Batch #', 'Job Description']
-        transaction_data = [transaction_headers]
-        
-        for tx in donor.transactions:
-            job_description = tx.bluebook_job_description or ""
-            if (tx.trans_date.year > 2018 and 
-                tx.payment_type == "E" and 
-                tx.bluebook_job_description == "DUES OR EAGLES"):
-                job_description = "PS EAGLES"
-            
-            transaction_data.append([
-                tx.trans_date.strftime("%Y-%m-%d"),
-                format_currency(tx.trans_amount),
-                tx.payment_type or "",
-                tx.payment_method or "",
-                tx.update_batch_num or "",
-                job_description
-            ])
-        
-        # Create table with dynamic column widths
-        col_widths = [1*inch, 1*inch, 0.8*inch, 1*inch, 0.8*inch, 2*inch]
-        
-        transaction_table = Table(transaction_data, colWidths=col_widths, repeatRows=1)
-        transaction_table.setStyle(TableStyle([
-            ('BACKGROUND', (0, 0), (-1, 0), colors.grey),
-            ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
-            ('ALIGN', (0, 0), (-1, -1), 'LEFT'),
-            ('VALIGN', (0, 0), (-1, -1), 'TOP'),
-            ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
-            ('FONTSIZE', (0, 0), (-1, 0), 9),
-            ('BOTTOMPADDING', (0, 0), (-1, 0), 8),
-            ('TOPPADDING', (0, 0), (-1, 0), 8),
-            ('BACKGROUND', (0, 1), (-1, -1), colors.white),
-            ('TEXTCOLOR', (0, 1), (-1, -1), colors.black),
-            ('FONTNAME', (0, 1), (-1, -1), 'Helvetica'),
-            ('FONTSIZE', (0, 1), (-1, -1), 8),
-            ('TOPPADDING', (0, 1), (-1, -1), 4),
-            ('BOTTOMPADDING', (0, 1), (-1, -1), 4),
-            ('LEFTPADDING', (0, 0), (-1, -1), 4),
-            ('RIGHTPADDING', (0, 0), (-1, -1), 4),
-            ('GRID', (0, 0), (-1, -1), 0.5, colors.black),
-            ('ROWBACKGROUNDS', (0, 1), (-1, -1), [colors.white, colors.lightgrey]),
-        ]))
-        
-        elements.append(transaction_table)
-    else:
-        elements.append(Paragraph("Transaction History", heading_style))
-        elements.append(Paragraph("No transactions found for this donor.", normal_style))
-    
-    # Build PDF
-    doc.build(elements)
+    write_donor_profile_pdf(buffer, donor, gifted_to, gifted_by)
     buffer.seek(0)
     
     # Generate filename
@@ -3315,6 +4279,140 @@ def download_donor_profile_pdf(donor_id):
     finally:
         session.close()
 
+_profile_pdf_pool = None
+_profile_pdf_pool_lock = threading.Lock()
+
+def profile_pdf_pool():
+    """Process pool for profile rendering (reportlab is CPU-bound), started on first use"""
+    global _profile_pdf_pool
+    with _profile_pdf_pool_lock:
+        if _profile_pdf_pool is None:
+            # spawn rather than fork: the web server process has threads and open database connections.
+            # Workers import donor_profiles (not this app) and open their own engine in the initializer.
+            _profile_pdf_pool = ProcessPoolExecutor(
+                max_workers=PROFILE_PDF_PROCESSES,
+                mp_context=multiprocessing.get_context("spawn"),
+                initializer=init_profile_worker,
+                initargs=(DATABASE_URL,)
+            )
+        return _profile_pdf_pool
+
+class ZipStreamBuffer:
+    """Write-only file object for zipfile; the bytes written so far are collected with take()"""
+
+    def __init__(self):
+        self.chunks = []
+
+    def write(self, data):
+        self.chunks.append(bytes(data))
+        return len(data)
+
+    def flush(self):
+        pass
+
+    def take(self):
+        data = b''.join(self.chunks)
+        self.chunks = []
+        return data
+
+@app.route("/download_donor_profiles", methods=["POST"])
+def download_donor_profiles():
+    """Download the profile PDFs of every donor in the cached search results as one ZIP"""
+    from flask import Response
+    
+    db_session = Session()
+    try:
+        if not is_search_session_valid():
+            flash("No valid search results found. Please perform a search first.", "error")
+            return redirect(request.referrer or url_for('home'))
+        
+        cached_results = get_cached_search_results()
+        if cached_results is None:
+            flash("Your cached search results have expired. Please run the search again.", "error")
+            return redirect(request.referrer or url_for('home'))
+        
+        if cached_results['donor_ids'] is None:
+            query, _ = build_search_query(db_session, cached_results['search_params'])
+            cached_results = materialize_search_results(query, cached_results)
+        donor_ids = cached_results['donor_ids']
+        
+        if not donor_ids:
+            flash("No results found for your search criteria.", "warning")
+            return redirect(request.referrer or url_for('home'))
+        
+        if len(donor_ids) > MAX_PROFILE_PDF_RESULTS:
+            flash(f"Search returned {len(donor_ids):,} results, which exceeds the donor profile download limit of {MAX_PROFILE_PDF_RESULTS:,} donors. Please refine your search criteria.", "error")
+            return redirect(request.referrer or url_for('home'))
+    finally:
+        db_session.close()
+    
+    chunks = (donor_ids[i:i + PROFILE_PDF_CHUNK_SIZE] for i in range(0, len(donor_ids), PROFILE_PDF_CHUNK_SIZE))
+    
+    def generate_zip_data():
+        """Yields the ZIP as each chunk of profiles comes back from the pool (in result order)
+
+        At most PROFILE_PDF_WINDOW chunks are queued on the pool at a time; whatever is still queued
+        is cancelled when the client disconnects or a worker fails.
+        """
+        pool = profile_pdf_pool()
+        pending = deque(pool.submit(render_donor_profile_chunk, chunk) for chunk in islice(chunks, PROFILE_PDF_WINDOW))
+        buffer = ZipStreamBuffer()
+        # PDFs are already compressed, so they are stored as-is
+        archive = zipfile.ZipFile(buffer, 'w', compression=zipfile.ZIP_STORED)
+        try:
+            while pending:
+                profiles = pending.popleft().result()
+                pending.extend(pool.submit(render_donor_profile_chunk, chunk) for chunk in islice(chunks, 1))
+                for filename, pdf in profiles:
+                    archive.writestr(filename, pdf)
+                yield buffer.take()
+            # The central directory is only written once every profile is in: a download cut short by
+            # an error is an unreadable ZIP rather than one that opens with profiles missing
+            archive.close()
+            yield buffer.take()
+        except Exception:
+            app.logger.exception("Donor profile ZIP failed")
+            raise
+        finally:
+            for future in pending:
+                future.cancel()
+    
+    timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
+    return Response(
+        generate_zip_data(),
+        mimetype='application/zip',
+        headers={'Content-Disposition': f'attachment; filename=donor_profiles_{timestamp}.zip'}
+    )
+
+def split_sql_statements(sql):
+    """Split a migration file into statements (one per line ending in ';', $$ function bodies kept whole)"""
+    statements, current, in_dollar_quote = [], [], False
+    for line in sql.splitlines():
+        if not current and (not line.strip() or line.strip().startswith('--')):
+            continue
+        current.append(line)
+        if line.count('$$') % 2:
+            in_dollar_quote = not in_dollar_quote
+        if not in_dollar_quote and line.rstrip().endswith(';'):
+            statements.append('\n'.join(current))
+            current = []
+    if current:
+        statements.append('\n'.join(current))
+    return statements
+
+@app.cli.command("apply-migrations")
+@click.argument("paths", nargs=-1, required=True, type=click.Path(exists=True, dir_okay=False))
+def apply_migrations(paths):
+    """Run migration files statement by statement in autocommit mode (needed for CREATE INDEX CONCURRENTLY)"""
+    with engine.connect().execution_options(isolation_level="AUTOCOMMIT") as conn:
+        for path in paths:
+            with open(path) as f:
+                statements = split_sql_statements(f.read())
+            for statement in statements:
+                click.echo(f"{path}: {statement.splitlines()[0]}")
+                conn.exec_driver_sql(statement)
+    click.echo("Migrations applied.")
+
 if __name__ == "__main__":
     port = int(os.getenv("PORT") or os.getenv("FLASK_PORT", 5001))  # Check PORT first, then FLASK_PORT, default to 5001
     app.run(debug=True, port=port)
@@ -0,0 +1,34 @@
+-- Trigram indexes for substring and fuzzy donor/transaction searches.
+-- Matches the trigram_index() declarations in models.py.
+--
+-- Apply with:  psql "$DATABASE_URL" -f migrations/001_trigram_search_indexes.sql
+-- CONCURRENTLY cannot run inside a transaction block, so do not wrap this file in BEGIN/COMMIT.
+
+CREATE EXTENSION IF NOT EXISTS pg_trgm;
+
+CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_donors_first_name_trgm
+    ON eagletrustfund_donors USING gin (first_name gin_trgm_ops);
+CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_donors_last_name_trgm
+    ON eagletrustfund_donors USING gin (last_name gin_trgm_ops);
+CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_donors_formatted_full_name_trgm
+    ON eagletrustfund_donors USING gin (formatted_full_name gin_trgm_ops);
+CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_donors_email_address_trgm
+    ON eagletrustfund_donors USING gin (email_address gin_trgm_ops);
+CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_donors_city_trgm
+    ON eagletrustfund_donors USING gin (city gin_trgm_ops);
+CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_donors_alternate_id_trgm
+    ON eagletrustfund_donors USING gin (alternate_id gin_trgm_ops);
+
+CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_transactions_appeal_code_trgm
+    ON eagletrustfund_transactions USING gin (appeal_code gin_trgm_ops);
+CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_transactions_payment_type_trgm
+    ON eagletrustfund_transactions USING gin (payment_type gin_trgm_ops);
+CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_transactions_update_batch_num_trgm
+    ON eagletrustfund_transactions USING gin (update_batch_num gin_trgm_ops);
+CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_transactions_job_description_trgm
+    ON eagletrustfund_transactions USING gin (bluebook_job_description gin_trgm_ops);
+CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_transactions_list_description_trgm
+    ON eagletrustfund_transactions USING gin (bluebook_list_description gin_trgm_ops);
+
+ANALYZE eagletrustfund_donors;
+ANALYZE eagletrustfund_transactions;
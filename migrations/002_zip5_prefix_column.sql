@@ -0,0 +1,15 @@
+-- Normalized 5-digit ZIP column for range searches (zip5 in models.py).
+-- ZIP ranges in the donor search become "zip5 >= start AND zip5 < end" on this index
+-- instead of one ILIKE per ZIP code in the range.
+--
+-- Apply with:  psql "$DATABASE_URL" -f migrations/002_zip5_prefix_column.sql
+-- Adding a stored generated column rewrites eagletrustfund_donors, so run it off-hours.
+
+ALTER TABLE eagletrustfund_donors
+    ADD COLUMN IF NOT EXISTS zip5 varchar(5)
+    GENERATED ALWAYS AS (left(regexp_replace(zip_plus4, '[^0-9]', '', 'g'), 5)) STORED;
+
+CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_donors_zip5
+    ON eagletrustfund_donors (zip5);
+
+ANALYZE eagletrustfund_donors;
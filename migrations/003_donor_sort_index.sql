@@ -0,0 +1,8 @@
+-- Sort index for donor search results.
+-- Matches donor_sort_columns() in app.py, so each results page is an index seek on
+-- (last_name, first_name, base_donor_id) after the previous page's last row instead of an OFFSET scan.
+--
+-- Apply with:  psql "$DATABASE_URL" -f migrations/003_donor_sort_index.sql
+
+CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_donors_sort_name
+    ON eagletrustfund_donors ((coalesce(last_name, '')), (coalesce(first_name, '')), base_donor_id);
@@ -0,0 +1,72 @@
+-- Convert the donor summary and status dates from text to date columns.
+-- Matches the Date columns and ix_donors_*_date indexes in models.py, so date range filters
+-- compare dates on an index and transaction updates no longer re-parse the stored strings.
+--
+-- Values that are not a valid YYYY-MM-DD or MM/DD/YYYY date are copied to
+-- eagletrustfund_donor_date_quarantine (donor, column, original text) and set to NULL.
+--
+-- Apply once with:  psql "$DATABASE_URL" -f migrations/004_typed_donor_dates.sql
+-- The ALTER rewrites eagletrustfund_donors, so run it off-hours.
+
+CREATE FUNCTION pg_temp.try_parse_date(value text) RETURNS date
+LANGUAGE plpgsql IMMUTABLE AS $$
+BEGIN
+    value := btrim(value);
+    IF value ~ '^\d{4}-\d{1,2}-\d{1,2}$' THEN
+        RETURN to_date(value, 'YYYY-MM-DD');
+    ELSIF value ~ '^\d{1,2}/\d{1,2}/\d{4}$' THEN
+        RETURN to_date(value, 'MM/DD/YYYY');
+    END IF;
+    RETURN NULL;
+EXCEPTION WHEN others THEN
+    RETURN NULL;
+END;
+$$;
+
+CREATE TABLE IF NOT EXISTS eagletrustfund_donor_date_quarantine (
+    base_donor_id   integer NOT NULL,
+    column_name     text NOT NULL,
+    raw_value       text NOT NULL,
+    quarantined_at  timestamptz NOT NULL DEFAULT now()
+);
+
+BEGIN;
+
+INSERT INTO eagletrustfund_donor_date_quarantine (base_donor_id, column_name, raw_value)
+SELECT d.base_donor_id, v.column_name, v.raw_value
+FROM eagletrustfund_donors d
+CROSS JOIN LATERAL (VALUES
+    ('latest_date', d.latest_date),
+    ('largest_date', d.largest_date),
+    ('inception_date', d.inception_date),
+    ('expiration_date', d.expiration_date),
+    ('date_added_to_database', d.date_added_to_database),
+    ('birth_date', d.birth_date)
+) AS v(column_name, raw_value)
+WHERE btrim(coalesce(v.raw_value, '')) <> ''
+  AND pg_temp.try_parse_date(v.raw_value) IS NULL;
+
+ALTER TABLE eagletrustfund_donors
+    ALTER COLUMN latest_date TYPE date USING pg_temp.try_parse_date(latest_date),
+    ALTER COLUMN largest_date TYPE date USING pg_temp.try_parse_date(largest_date),
+    ALTER COLUMN inception_date TYPE date USING pg_temp.try_parse_date(inception_date),
+    ALTER COLUMN expiration_date TYPE date USING pg_temp.try_parse_date(expiration_date),
+    ALTER COLUMN date_added_to_database TYPE date USING pg_temp.try_parse_date(date_added_to_database),
+    ALTER COLUMN birth_date TYPE date USING pg_temp.try_parse_date(birth_date);
+
+COMMIT;
+
+CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_donors_latest_date
+    ON eagletrustfund_donors (latest_date);
+CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_donors_largest_date
+    ON eagletrustfund_donors (largest_date);
+CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_donors_inception_date
+    ON eagletrustfund_donors (inception_date);
+CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_donors_expiration_date
+    ON eagletrustfund_donors (expiration_date);
+CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_donors_date_added_to_database
+    ON eagletrustfund_donors (date_added_to_database);
+CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_donors_birth_date
+    ON eagletrustfund_donors (birth_date);
+
+ANALYZE eagletrustfund_donors;
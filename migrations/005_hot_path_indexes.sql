@@ -0,0 +1,26 @@
+-- B-tree indexes for batch, date, status and gift-recipient lookups.
+-- Matches the Index() declarations in models.py. ix_transactions_donor_date leads with
+-- base_donor_id, so it also covers "all gifts of a donor" without a separate index.
+--
+-- Apply with:  flask --app app apply-migrations migrations/005_hot_path_indexes.sql
+--         or:  psql "$DATABASE_URL" -f migrations/005_hot_path_indexes.sql
+-- CONCURRENTLY cannot run inside a transaction block, so do not wrap this file in BEGIN/COMMIT.
+
+CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_transactions_update_batch_num
+    ON eagletrustfund_transactions (update_batch_num);
+CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_transactions_trans_date
+    ON eagletrustfund_transactions (trans_date);
+CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_transactions_donor_date
+    ON eagletrustfund_transactions (base_donor_id, trans_date);
+
+CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_donors_gifted_to_donor_id
+    ON eagletrustfund_donors (gifted_to_donor_id);
+CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_donors_mailing_list_status
+    ON eagletrustfund_donors (mailing_list_status);
+CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_donors_newsletter_donor_status
+    ON eagletrustfund_donors (newsletter_status, donor_status);
+CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_donors_last_first_name
+    ON eagletrustfund_donors (last_name, first_name);
+
+ANALYZE eagletrustfund_transactions;
+ANALYZE eagletrustfund_donors;
@@ -0,0 +1,28 @@
+-- Idempotent batch entry commits.
+-- Matches EagleTrustFundBatchSubmission, EagleTrustFundTransaction.content_hash and
+-- ux_transactions_content_hash in models.py:
+--   * every committed batch submission records its token and a hash of its content, so a replayed
+--     submission (double click, browser retry) is found by primary key and answered with the
+--     original result, while a reused token with different content is refused;
+--   * batch rows carry a hash of (donor, date, amount, batch, occurrence), and the unique index
+--     rejects a second copy of the same batch rows submitted under a new token.
+-- Existing transactions keep a NULL hash and are not affected by the index.
+--
+-- Apply with:  flask --app app apply-migrations migrations/006_idempotent_batch_commits.sql
+--         or:  psql "$DATABASE_URL" -f migrations/006_idempotent_batch_commits.sql
+-- CONCURRENTLY cannot run inside a transaction block, so do not wrap this file in BEGIN/COMMIT.
+
+CREATE TABLE IF NOT EXISTS eagletrustfund_batch_submissions (
+    submission_token  varchar PRIMARY KEY,
+    payload_hash      varchar(64) NOT NULL,
+    update_batch_num  varchar,
+    num_transactions  integer NOT NULL,
+    total_amount      numeric(12, 2) NOT NULL,
+    created_at        timestamptz NOT NULL DEFAULT now()
+);
+
+ALTER TABLE eagletrustfund_transactions ADD COLUMN IF NOT EXISTS content_hash varchar(64);
+
+CREATE UNIQUE INDEX CONCURRENTLY IF NOT EXISTS ux_transactions_content_hash
+    ON eagletrustfund_transactions (content_hash)
+    WHERE content_hash IS NOT NULL;
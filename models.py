@@ -1,11 +1,40 @@
-from sqlalchemy import Column, Integer, String, Date, DECIMAL, ForeignKey, Boolean
+from sqlalchemy import Column, Integer, String, Date, DateTime, DECIMAL, ForeignKey, Boolean, Index, Computed, func, text
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import relationship
 
 Base = declarative_base()
 
+def trigram_index(name, column):
+    """GIN trigram index (pg_trgm) so ILIKE '%term%' and similarity searches can use an index"""
+    return Index(name, column, postgresql_using="gin", postgresql_ops={column: "gin_trgm_ops"})
+
 class EagleTrustFundDonor(Base):
     __tablename__ = "eagletrustfund_donors"
+    __table_args__ = (
+        # Substring / fuzzy search indexes (see migrations/001_trigram_search_indexes.sql)
+        trigram_index("ix_donors_first_name_trgm", "first_name"),
+        trigram_index("ix_donors_last_name_trgm", "last_name"),
+        trigram_index("ix_donors_formatted_full_name_trgm", "formatted_full_name"),
+        trigram_index("ix_donors_email_address_trgm", "email_address"),
+        trigram_index("ix_donors_city_trgm", "city"),
+        trigram_index("ix_donors_alternate_id_trgm", "alternate_id"),
+        # ZIP range searches (see migrations/002_zip5_prefix_column.sql)
+        Index("ix_donors_zip5", "zip5"),
+        # Search result order and keyset pagination (see migrations/003_donor_sort_index.sql)
+        Index("ix_donors_sort_name", text("coalesce(last_name, '')"), text("coalesce(first_name, '')"), "base_donor_id"),
+        # Date range filters (see migrations/004_typed_donor_dates.sql)
+        Index("ix_donors_latest_date", "latest_date"),
+        Index("ix_donors_largest_date", "largest_date"),
+        Index("ix_donors_inception_date", "inception_date"),
+        Index("ix_donors_expiration_date", "expiration_date"),
+        Index("ix_donors_date_added_to_database", "date_added_to_database"),
+        Index("ix_donors_birth_date", "birth_date"),
+        # Lookups by status, gift recipient and plain name order (see migrations/005_hot_path_indexes.sql)
+        Index("ix_donors_gifted_to_donor_id", "gifted_to_donor_id"),
+        Index("ix_donors_mailing_list_status", "mailing_list_status"),
+        Index("ix_donors_newsletter_donor_status", "newsletter_status", "donor_status"),
+        Index("ix_donors_last_first_name", "last_name", "first_name"),
+    )
 
     base_donor_id               = Column(Integer, primary_key=True, autoincrement=True)
     old_donor_id                = Column(Integer)  # Legacy donor ID for reference
@@ -26,6 +55,8 @@ class EagleTrustFundDonor(Base):
     city                        = Column(String)
     state                       = Column(String)
     zip_plus4                   = Column(String)
+    # First five digits of zip_plus4, maintained by Postgres for indexed ZIP range searches
+    zip5                        = Column(String(5), Computed("left(regexp_replace(zip_plus4, '[^0-9]', '', 'g'), 5)", persisted=True))
     country                     = Column(String)
     phone                       = Column(String)
     work_phone                  = Column(String)
@@ -34,12 +65,12 @@ class EagleTrustFundDonor(Base):
     removal_request_note        = Column(String)
     twitter                     = Column(String)
     gender_code                 = Column(String)
-    birth_date                  = Column(String)
+    birth_date                  = Column(Date)
     newsletter_status           = Column(String)
     newsletter_status_desc      = Column(String)
     donor_status                = Column(String)
     donor_status_desc           = Column(String)
-    date_added_to_database      = Column(String)
+    date_added_to_database      = Column(Date)
     email_address               = Column(String)
     phone_number                = Column(String)
     interest_borders            = Column(String)
@@ -50,7 +81,7 @@ class EagleTrustFundDonor(Base):
     interest_topic_3            = Column(String)
     interest_topic_4            = Column(String)
     education_reporter_status   = Column(String)
-    expiration_date             = Column(String)
+    expiration_date             = Column(Date)
     news_and_notes_status       = Column(String)
     rnc_life_status             = Column(String)
     eagle_status                = Column(String)
@@ -59,11 +90,11 @@ class EagleTrustFundDonor(Base):
     changed                     = Column(String)
     interest                    = Column(String)
     house_publications          = Column(String)
-    latest_date                 = Column(String)
+    latest_date                 = Column(Date)
     latest_amount               = Column(DECIMAL(10, 2))
-    largest_date                = Column(String)
+    largest_date                = Column(Date)
     largest_amount              = Column(DECIMAL(10, 2))
-    inception_date              = Column(String)
+    inception_date              = Column(Date)
     inception_amount            = Column(DECIMAL(10, 2))
     total_dollar_amount         = Column(DECIMAL(10, 2))
     total_responses_non_zero    = Column(Integer)
@@ -94,6 +125,22 @@ class EagleTrustFundDonor(Base):
 
 class EagleTrustFundTransaction(Base):
     __tablename__ = "eagletrustfund_transactions"
+    __table_args__ = (
+        # Substring search indexes (see migrations/001_trigram_search_indexes.sql)
+        trigram_index("ix_transactions_appeal_code_trgm", "appeal_code"),
+        trigram_index("ix_transactions_payment_type_trgm", "payment_type"),
+        trigram_index("ix_transactions_update_batch_num_trgm", "update_batch_num"),
+        trigram_index("ix_transactions_job_description_trgm", "bluebook_job_description"),
+        trigram_index("ix_transactions_list_description_trgm", "bluebook_list_description"),
+        # Batch and date lookups, and a donor's gifts by date (see migrations/005_hot_path_indexes.sql).
+        # The composite index also serves lookups by base_donor_id alone.
+        Index("ix_transactions_update_batch_num", "update_batch_num"),
+        Index("ix_transactions_trans_date", "trans_date"),
+        Index("ix_transactions_donor_date", "base_donor_id", "trans_date"),
+        # A batch row can only be inserted once (see batch_content_hashes in app.py and
+        # migrations/006_idempotent_batch_commits.sql); rows entered one at a time have no hash
+        Index("ux_transactions_content_hash", "content_hash", unique=True, postgresql_where=text("content_hash IS NOT NULL")),
+    )
 
     transaction_id            = Column(Integer, primary_key=True, autoincrement=True)
     base_donor_id             = Column(
@@ -110,8 +157,20 @@ class EagleTrustFundTransaction(Base):
     bluebook_job_description  = Column(String)
     bluebook_list_description = Column(String)
     payment_method            = Column(String)
+    content_hash              = Column(String(64))
 
     donor = relationship(
         "EagleTrustFundDonor",
         back_populates="transactions"
     )
+
+class EagleTrustFundBatchSubmission(Base):
+    """One committed batch entry submission, so a replayed submission returns the original result"""
+    __tablename__ = "eagletrustfund_batch_submissions"
+
+    submission_token  = Column(String, primary_key=True)
+    payload_hash      = Column(String(64), nullable=False)  # batch_payload_hash in app.py
+    update_batch_num  = Column(String)
+    num_transactions  = Column(Integer, nullable=False)
+    total_amount      = Column(DECIMAL(12, 2), nullable=False)
+    created_at        = Column(DateTime(timezone=True), nullable=False, server_default=func.now())